@@ -7,13 +7,18 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from dotenv import load_dotenv
 import secrets
+import orjson
 from services.common.log_creator import create_logger
 from services.vector_store.openai.vector_store_router import openai_vector_store_router
+from services.vector_store.openai.vector_store_router import sync_worker_pool as openai_vector_store_sync_workers
 from services.vector_store.openai.db import init_db as openai_vector_store_db_init
+from services.vector_store.openai.db import close_pool as openai_vector_store_db_close
+from services.vector_store.openai.vector_store_service import vector_store_service as openai_vector_store_service
 from services.workflow.n8n.n8n_router import n8n_router
+from services.workflow.n8n.n8n_service import n8n_service
 from services.telegram.sender_router import (
     telegram_sender_router,
     init_telegram_sender,
@@ -55,6 +60,7 @@ async def lifespan(app: FastAPI):
     """
     logger.info("Starting up chatbot platform...")
     openai_vector_store_db_init()
+    await openai_vector_store_sync_workers.start()
     
     # Initialize Telegram sender service
     try:
@@ -72,7 +78,11 @@ async def lifespan(app: FastAPI):
         await shutdown_telegram_sender()
     except Exception as e:
         logger.warning(f"Error shutting down Telegram sender: {e}")
-    # Clean up resources here
+    
+    await openai_vector_store_sync_workers.stop()
+    await openai_vector_store_service.close()
+    await n8n_service.aclose()
+    openai_vector_store_db_close()
 
 
 def create_app() -> FastAPI:
@@ -106,11 +116,14 @@ def create_app() -> FastAPI:
 
 app = create_app()
 
+# Static health body, encoded once at import
+_HEALTH_BODY = orjson.dumps({"status": "healthy", "message": "Chatbot platform is running"})
+
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "message": "Chatbot platform is running"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 
 @app.exception_handler(Exception)
@@ -125,7 +138,12 @@ async def global_exception_handler(request, exc):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app,
+    # Each worker starts its own Telegram client on the same session file,
+    # so keep WORKERS=1 unless the Telegram sender is disabled.
+    uvicorn.run("main:app",
                 host="0.0.0.0",
-                port=int(os.getenv("SERVICE_PORT", 8000))
+                port=int(os.getenv("SERVICE_PORT", 8000)),
+                loop="uvloop",
+                http="httptools",
+                workers=int(os.getenv("WORKERS", 1))
                 ) 
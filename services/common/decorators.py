@@ -1,12 +1,18 @@
 from datetime import datetime
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import HTTPException
 from functools import wraps
 from typing import Callable
-import json
+from services.common.exceptions import ServiceInputError
+import logging
+import orjson
 import traceback
 import sys
 
+# Handlers are configured by the app (create_logger); creating them here at
+# import time would run before the importing module loads its .env
+logger = logging.getLogger(__name__)
+
 
 # Decorator to handle response formatting
 def response_formatter(func: Callable):
@@ -17,8 +23,7 @@ def response_formatter(func: Callable):
             # Call the function and get the response data (should be a dictionary)
             result = await func(*args, **kwargs)
             status_code = result.status_code
-            json_str = result.body.decode('utf-8')
-            data = json.loads(json_str)
+            data = orjson.loads(result.body)
             exception = None
             status = True
         except HTTPException as http_exc:
@@ -30,6 +35,19 @@ def response_formatter(func: Callable):
             }
             exception = str(http_exc)
             status = False
+            if status_code >= 500:
+                logger.error(f"{func.__name__} failed: {http_exc.detail}")
+        except ServiceInputError as input_error:
+            # Services raise ServiceInputError for requests they cannot serve
+            # as given, so it maps to 400 without every route catching it
+            status_code = 400
+            data = {
+                'detail': str(input_error),
+                'headers': None,
+            }
+            exception = str(input_error)
+            status = False
+            logger.warning(f"{func.__name__} rejected request: {input_error}")
         except Exception as e:
             # Handle general exceptions
             exc_type, exc_value, exc_tb = sys.exc_info()
@@ -44,6 +62,7 @@ def response_formatter(func: Callable):
             }
             exception = f"{exc_type.__name__}: {e} at line {line_number} in {file_name}"
             status = False
+            logger.error(f"Unhandled error in {func.__name__}: {exception}")
 
         end_at = datetime.now()
 
@@ -62,7 +81,7 @@ def response_formatter(func: Callable):
             'data': data  # Method response data
         }
 
-        # Return the JSONResponse with the correct structure
-        return JSONResponse(content=response_data, status_code=status_code)
+        # Return the ORJSONResponse with the correct structure
+        return ORJSONResponse(content=response_data, status_code=status_code)
 
     return wrapper
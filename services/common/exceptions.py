@@ -0,0 +1,2 @@
+class ServiceInputError(Exception):
+    """Raised by services when a request cannot be served as given (maps to HTTP 400)"""
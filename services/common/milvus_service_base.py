@@ -1,15 +1,50 @@
 from pymilvus import MilvusClient, DataType
 from services.common.log_creator import create_logger
 import os
+import re
 import httpx
 import asyncio
-from typing import Dict, Any, List, Optional
+import numpy as np
+from functools import cached_property, lru_cache
+from typing import Dict, Any, List, Optional, Union
 from abc import ABC, abstractmethod
 from services.embedding.openai.embedding_service import create_embeddings
 from services.embedding.openai.models import Item
+
+# Build parameters per supported MILVUS_INDEX_TYPE. IVF_SQ8 stores the
+# vectors as int8 in the index, a quarter of float32's scan bandwidth.
+INDEX_BUILD_PARAMS = {
+    "IVF_FLAT": {"nlist": 1024},
+    "IVF_SQ8": {"nlist": 1024},
+    "IVF_PQ": {"nlist": 1024, "m": 16},  # m must divide the vector dimension
+    "HNSW": {"M": 16, "efConstruction": 200},
+}
+
+# NumPy dtype for each vector field type the services can read and write
+VECTOR_DTYPES = {
+    DataType.FLOAT_VECTOR: np.float32,
+    DataType.FLOAT16_VECTOR: np.float16,
+}
+
+# A quoted string literal or a run of whitespace
+_FILTER_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|\s+')
+
+
+@lru_cache(maxsize=512)
+def normalize_filter_expression(filter_expression: str) -> str:
+    """Collapse whitespace outside string literals so equivalent filters share one form"""
+    return _FILTER_TOKEN.sub(
+        lambda m: " " if m.group().isspace() else m.group(),
+        filter_expression
+    ).strip()
+
+
 class MilvusServiceBase(ABC):
     """Base service class for handling Milvus operations"""
     
+    # NumPy dtype matching the vector field type declared in _create_schema
+    vector_dtype = np.float32
+    
     def __init__(self, uri: str = "http://localhost:19530/", collection_name: str = None, logger=None):
         """Initialize Milvus service with connection"""
         self.client = MilvusClient(uri=uri)
@@ -17,6 +52,9 @@ class MilvusServiceBase(ABC):
         self.text_embedding_dimension = int(os.getenv("TEXT_EMBEDDING_DIMENSION", 1536))
         self.media_embedding_dimension = int(os.getenv("MEDIA_EMBEDDING_DIMENSION", 1536))
         self.embedding_service_url = os.getenv("EMBEDDING_SERVICE_URL", "http://localhost:8000")
+        self.index_type = os.getenv("MILVUS_INDEX_TYPE", "IVF_SQ8").upper()
+        if self.index_type not in INDEX_BUILD_PARAMS:
+            raise ValueError(f"Unsupported MILVUS_INDEX_TYPE '{self.index_type}', expected one of {list(INDEX_BUILD_PARAMS)}")
         
         if logger is None:
             is_production = os.getenv("IS_PRODUCTION", "no")
@@ -37,6 +75,19 @@ class MilvusServiceBase(ABC):
         """Get default features to embed - must be implemented by subclasses"""
         pass
     
+    @cached_property
+    def _schema(self):
+        """Collection schema, built once per service instance"""
+        return self._create_schema()
+    
+    @cached_property
+    def _primary_field(self) -> str:
+        """Name of the primary key field (falls back to 'id')"""
+        for field in self._schema.fields:
+            if field.is_primary:
+                return field.name
+        return "id"
+    
     def _create_indexes(self):
         """Create indexes for the collection to optimize search performance"""
         try:
@@ -45,11 +96,9 @@ class MilvusServiceBase(ABC):
             
             index_params.add_index(
                 field_name="text_content_embedding",
-                index_type="IVF_FLAT",
+                index_type=self.index_type,
                 metric_type="COSINE",  # Can be COSINE, L2, or IP
-                params={
-                    "nlist": 1024  # Number of cluster units
-                }
+                params=INDEX_BUILD_PARAMS[self.index_type]
             )
             
             self.client.create_index(
@@ -57,7 +106,7 @@ class MilvusServiceBase(ABC):
                 index_params=index_params
             )
             
-            self.logger.info(f"Index created for 'text_content_embedding' field in collection '{self.collection_name}'")
+            self.logger.info(f"{self.index_type} index created for 'text_content_embedding' field in collection '{self.collection_name}'")
             
         except Exception as e:
             self.logger.error(f"Error creating indexes: {str(e)}")
@@ -81,53 +130,93 @@ class MilvusServiceBase(ABC):
                 self._create_indexes()
             else:
                 self.logger.info(f"Collection '{self.collection_name}' already exists")
+                self._use_live_vector_dtype()
             self.client.load_collection(self.collection_name)
         except Exception as e:
             self.logger.error(f"Error initializing collection: {str(e)}")
             raise
     
+    def _use_live_vector_dtype(self):
+        """Match vector_dtype to the existing collection's vector field.
+
+        A collection created before the declared vector type changed keeps its
+        old type; converting to it keeps inserts and searches working.
+        """
+        description = self.client.describe_collection(self.collection_name)
+        field = next(
+            (field for field in description.get("fields", []) if field.get("name") == "text_content_embedding"),
+            None
+        )
+        if field is None:
+            raise ValueError(f"Collection '{self.collection_name}' has no 'text_content_embedding' field")
+        
+        live_type = DataType(field.get("type"))
+        live_dtype = VECTOR_DTYPES.get(live_type)
+        if live_dtype is None:
+            raise ValueError(
+                f"Collection '{self.collection_name}' stores 'text_content_embedding' as {live_type.name}, "
+                f"which is not supported; migrate it to one of {[t.name for t in VECTOR_DTYPES]}"
+            )
+        if live_dtype is not self.vector_dtype:
+            self.logger.warning(
+                f"Collection '{self.collection_name}' stores 'text_content_embedding' as {live_type.name}, "
+                f"not the declared type; using {np.dtype(live_dtype).name} until it is recreated"
+            )
+            self.vector_dtype = live_dtype
+    
     async def _get_text_embedding(self, features_to_embed: List[str], **kwargs) -> List[float]:
         """Get text embedding from embedding service for specified features"""
+        embeddings = await self._get_text_embeddings(features_to_embed=features_to_embed, records=[kwargs])
+        return embeddings[0]
+    
+    async def _get_text_embeddings(self, features_to_embed: List[str], records: List[Dict[str, Any]]) -> List[List[float]]:
+        """Get text embeddings for many records with a single embedding service call"""
         try:
             # Prepare content by combining specified features
-            content_dict = {}
-            for feature in features_to_embed:
-                if feature in kwargs and kwargs[feature] is not None:
-                    # Handle different data types
-                    value = kwargs[feature]
-                    content_dict[feature] = str(value)
-                else:
-                    raise Exception(f"No valid content found for embedding, using empty text for feature: {feature}")
+            contents = []
+            for record in records:
+                content_dict = {}
+                for feature in features_to_embed:
+                    if feature in record and record[feature] is not None:
+                        # Handle different data types
+                        content_dict[feature] = str(record[feature])
+                    else:
+                        raise Exception(f"No valid content found for embedding, using empty text for feature: {feature}")
+                contents.append(content_dict)
 
-            embedding = await create_embeddings(Item(contents=[content_dict], features=list(content_dict.keys())))
-            return embedding[0].get("embedding")
+            embeddings = await create_embeddings(Item(contents=contents, features=list(features_to_embed)))
+            return [embedding.get("embedding") for embedding in embeddings]
         except Exception as e:
             self.logger.error(f"Error getting text embedding: {str(e)}")
             raise Exception(f"Error getting text embedding: {str(e)}")
     
     async def save_record(self, **kwargs) -> Dict[str, Any]:
         """Save record data to Milvus collection - general method for any record type"""
+        return await self.save_records([kwargs])
+    
+    async def save_records(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Save many records with one batched embedding call and one Milvus insert"""
         try:
             # Use default embedding features defined by the class
             features_to_embed = self._get_default_embedding_features()
             
-            # Get text embedding from embedding service
-            text_embedding = await self._get_text_embedding(features_to_embed=features_to_embed, **kwargs)
-            
-            # Prepare basic data structure with embedding
-            data_to_insert = {}
+            # Get text embeddings from embedding service
+            text_embeddings = await self._get_text_embeddings(features_to_embed=features_to_embed, records=records)
             
-            # Add all provided fields to the data structure
-            for key, value in kwargs.items():
-                data_to_insert[key] = value
+            # Convert all embeddings in one (n, dim) array instead of one row at a time
+            vectors = np.asarray(text_embeddings, dtype=self.vector_dtype)
             
-            # Always add the embedding field
-            data_to_insert["text_content_embedding"] = text_embedding
+            # Add all provided fields plus the embedding field to each row
+            data_to_insert = [
+                {**record, "text_content_embedding": vector}
+                for record, vector in zip(records, vectors)
+            ]
             
-            # Insert data into Milvus
-            result = self.client.insert(
+            # Insert data into Milvus (the client is blocking, keep it off the event loop)
+            result = await asyncio.to_thread(
+                self.client.insert,
                 collection_name=self.collection_name,
-                data=[data_to_insert]
+                data=data_to_insert
             )
             
             insert_count = result.get('insert_count', 0)
@@ -156,8 +245,7 @@ class MilvusServiceBase(ABC):
                 stats = self.client.get_collection_stats(self.collection_name)
                 
                 # Get actual schema fields dynamically
-                schema = self._create_schema()
-                schema_fields = [field.name for field in schema.fields]
+                schema_fields = [field.name for field in self._schema.fields]
                 
                 return {
                     "collection_name": self.collection_name,
@@ -181,7 +269,14 @@ class MilvusServiceBase(ABC):
                 "message": error_msg
             }
     
-    async def search_by_vector(self, query_vector: List[float], limit: int = 10, output_fields: List[str] = None) -> Dict[str, Any]:
+    def _as_query_vector(self, query_vector: Union[List[float], np.ndarray]) -> np.ndarray:
+        """Convert a query vector once to a contiguous array of the collection's vector dtype"""
+        vector = np.ascontiguousarray(query_vector, dtype=self.vector_dtype)
+        if vector.shape != (self.text_embedding_dimension,):
+            raise ValueError(f"Query vector has shape {vector.shape}, expected ({self.text_embedding_dimension},)")
+        return vector
+    
+    async def search_by_vector(self, query_vector: Union[List[float], np.ndarray], limit: int = 10, output_fields: List[str] = None) -> Dict[str, Any]:
         """Search for similar records using vector similarity"""
         try:
             if output_fields is None:
@@ -189,7 +284,7 @@ class MilvusServiceBase(ABC):
                 
             search_results = self.client.search(
                 collection_name=self.collection_name,
-                data=[query_vector],
+                data=[self._as_query_vector(query_vector)],
                 anns_field="text_content_embedding",
                 limit=limit,
                 output_fields=output_fields
@@ -246,6 +341,7 @@ class MilvusServiceBase(ABC):
     def delete_records(self, filter_expression: str) -> Dict[str, Any]:
         """Delete records based on filter expression"""
         try:
+            filter_expression = normalize_filter_expression(filter_expression)
             result = self.client.delete(
                 collection_name=self.collection_name,
                 filter=filter_expression
@@ -271,21 +367,13 @@ class MilvusServiceBase(ABC):
     def count_records(self, filter_expression: str = None) -> Dict[str, Any]:
         """Count records in the collection"""
         try:
-            # Get primary key field name from schema
-            schema = self._create_schema()
-            primary_field = None
-            for field in schema.fields:
-                if field.is_primary:
-                    primary_field = field.name
-                    break
-            
-            if not primary_field:
-                primary_field = "id"  # fallback
+            if filter_expression:
+                filter_expression = normalize_filter_expression(filter_expression)
             
             search_results = self.client.query(
                 collection_name=self.collection_name,
                 filter=filter_expression or "",
-                output_fields=[primary_field],
+                output_fields=[self._primary_field],
             )
             
             count = len(search_results)
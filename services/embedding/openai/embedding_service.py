@@ -1,10 +1,14 @@
 import os
+import hashlib
+import threading
 from pathlib import Path
 from dotenv import load_dotenv
 from services.common.log_creator import create_logger
 from services.embedding.openai.models import Item
 import litellm
 import asyncio
+import numpy as np
+from cachetools import TTLCache
 
 # Load environment variables from .env file in the same directory
 env_path = Path(__file__).parent / '.env'
@@ -14,10 +18,21 @@ load_dotenv(dotenv_path=env_path, override=True)
 EMBEDDING_MODEL = os.getenv("LITELLM_MODEL_NAME", 'text-embedding-3-small')
 IS_PRODUCTION = os.getenv("IS_PRODUCTION", 'no')
 LOG_URL = os.getenv('LOG_URL', './logs')
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", str(30 * 86400)))  # seconds
 
 # Initialize logger
 logger = create_logger(IS_PRODUCTION, LOG_URL)
 
+# Content-addressed embedding cache: hash(model, text) -> float32 vector.
+# Re-synced documents and repeated queries skip the provider call.
+_embedding_cache: TTLCache = TTLCache(maxsize=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL)
+_embedding_cache_lock = threading.Lock()
+
+
+def _embedding_cache_key(text: str) -> bytes:
+    return hashlib.blake2b(f"{EMBEDDING_MODEL}\0{text}".encode("utf-8"), digest_size=16).digest()
+
 
 async def health_check():
     return {"status": "ok"}
@@ -39,11 +54,34 @@ async def create_embeddings(item: Item):
     if not content_to_embed_items:
         raise ValueError(f"No content provided to embed for ids: {item.id}")
     logger.info('Embedding service => content to embed: '+ str(content_to_embed_items)[:10])
-    response = litellm.embedding(model=EMBEDDING_MODEL, input=content_to_embed_items)
+
+    keys = [_embedding_cache_key(text) for text in content_to_embed_items]
+    with _embedding_cache_lock:
+        vectors = [_embedding_cache.get(key) for key in keys]
+
+    # Only texts missing from the cache (deduplicated) go to the provider
+    missing = {}
+    for index, (key, vector) in enumerate(zip(keys, vectors)):
+        if vector is None:
+            missing.setdefault(key, content_to_embed_items[index])
+    if missing:
+        # Async call so the event loop keeps serving other requests meanwhile
+        response = await litellm.aembedding(model=EMBEDDING_MODEL, input=list(missing.values()))
+        computed = {
+            key: np.asarray(data.get("embedding"), dtype=np.float32)
+            for key, data in zip(missing, response.data)
+        }
+        with _embedding_cache_lock:
+            _embedding_cache.update(computed)
+        vectors = [computed[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+    logger.info(f"Embedding service => {len(keys) - len(missing)} of {len(keys)} embeddings served from cache.")
 
     logger.info("Embedding service => create_embeddings endpoint is completed.")
 
-    return response.data
+    return [
+        {"object": "embedding", "index": index, "embedding": vector.tolist()}
+        for index, vector in enumerate(vectors)
+    ]
 
 
 async def main():
@@ -19,8 +19,19 @@ class CallbackService:
         self.http_session: aiohttp.ClientSession | None = None
     
     async def start(self):
-        """Initialize the HTTP session."""
-        self.http_session = aiohttp.ClientSession()
+        """Initialize the HTTP session shared by every callback."""
+        # Callbacks all go to one host: keep warm connections to it and set
+        # the timeout and headers once instead of per request
+        connector = aiohttp.TCPConnector(
+            limit=Config.CALLBACK_MAX_CONNECTIONS,
+            keepalive_timeout=60,
+            ttl_dns_cache=300
+        )
+        self.http_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=Config.CALLBACK_TIMEOUT),
+            headers={"Content-Type": "application/json"}
+        )
         logger.debug("CallbackService HTTP session started")
     
     async def stop(self):
@@ -40,28 +51,42 @@ class CallbackService:
         Returns:
             True if callback was sent successfully, False otherwise
         """
+        message_id = payload.get('message_id', 'unknown')
+        return await self._post(payload, f"message {message_id}")
+    
+    async def send_batch(self, payloads: list[dict]) -> bool:
+        """
+        Send several message payloads to the callback URL as one JSON array.
+        
+        Args:
+            payloads: The message payloads to send, in arrival order
+            
+        Returns:
+            True if callback was sent successfully, False otherwise
+        """
+        message_ids = ", ".join(str(payload.get('message_id', 'unknown')) for payload in payloads)
+        return await self._post(payloads, f"messages {message_ids}")
+    
+    async def _post(self, body: dict | list, description: str) -> bool:
+        """POST a JSON body to the callback URL with retries."""
         if not self.http_session:
             logger.error("CallbackService not started. Call start() first.")
             return False
         
-        message_id = payload.get('message_id', 'unknown')
-        
         for attempt in range(Config.CALLBACK_RETRIES):
             try:
                 async with self.http_session.post(
                     Config.CALLBACK_URL,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=Config.CALLBACK_TIMEOUT),
-                    headers={"Content-Type": "application/json"}
+                    json=body
                 ) as response:
                     if response.status == 200:
-                        logger.debug(f"Callback sent successfully for message {message_id}")
+                        logger.debug(f"Callback sent successfully for {description}")
                         return True
                     else:
-                        body = await response.text()
+                        response_body = await response.text()
                         logger.warning(
                             f"Callback failed (attempt {attempt + 1}/{Config.CALLBACK_RETRIES}): "
-                            f"HTTP {response.status} - {body[:200]}"
+                            f"HTTP {response.status} - {response_body[:200]}"
                         )
             
             except asyncio.TimeoutError:
@@ -77,6 +102,5 @@ class CallbackService:
             if attempt < Config.CALLBACK_RETRIES - 1:
                 await asyncio.sleep(2 ** attempt)
         
-        logger.error(f"Failed to send callback for message {message_id} after {Config.CALLBACK_RETRIES} attempts")
+        logger.error(f"Failed to send callback for {description} after {Config.CALLBACK_RETRIES} attempts")
         return False
-
@@ -18,11 +18,26 @@ class Config:
     # HTTP request settings
     CALLBACK_TIMEOUT = int(os.getenv("CALLBACK_TIMEOUT", "10"))
     CALLBACK_RETRIES = int(os.getenv("CALLBACK_RETRIES", "3"))
+    CALLBACK_MAX_CONNECTIONS = int(os.getenv("CALLBACK_MAX_CONNECTIONS", "20"))
+    
+    # Callback batching: single messages arriving within the window are sent
+    # together as one JSON array (0 disables batching; the receiver must
+    # accept arrays when enabled)
+    CALLBACK_BATCH_WINDOW_MS = int(os.getenv("CALLBACK_BATCH_WINDOW_MS", "0"))
+    CALLBACK_BATCH_MAX = int(os.getenv("CALLBACK_BATCH_MAX", "16"))
+    
+    # Sender settings
+    MAX_CONCURRENT_SENDS = int(os.getenv("MAX_CONCURRENT_SENDS", "10"))
     
     # Media download settings
     ENABLE_MEDIA_DOWNLOAD = os.getenv("ENABLE_MEDIA_DOWNLOAD", "true").lower() == "true"
     MAX_MEDIA_SIZE = int(os.getenv("MAX_MEDIA_SIZE", "10"))  # MB
     MEDIA_GROUP_TIMEOUT = float(os.getenv("MEDIA_GROUP_TIMEOUT", "5.0"))  # seconds
+    MEDIA_CONCURRENCY = int(os.getenv("MEDIA_CONCURRENCY", "4"))  # parallel media downloads
+    MAX_MEDIA_GROUPS = int(os.getenv("MAX_MEDIA_GROUPS", "1024"))  # buffered albums at once
+    # Worker processes for base64-encoding media (0 encodes on the event loop;
+    # only worth it when MAX_MEDIA_SIZE is large)
+    MEDIA_CPU_WORKERS = int(os.getenv("MEDIA_CPU_WORKERS", "0"))
     
     # Media types to download (comma-separated)
     # Options: photo, video, audio, voice, document, sticker, animation
@@ -2,8 +2,10 @@
 Media Service - Handles downloading media from Telegram messages as base64.
 """
 
+import asyncio
 import base64
 import logging
+from concurrent.futures import Executor
 from io import BytesIO
 
 from telethon.tl.types import (
@@ -17,6 +19,11 @@ from services.telegram.config import Config
 logger = logging.getLogger(__name__)
 
 
+def _encode_base64(data: bytes) -> str:
+    """Base64-encode media bytes (module level so a process pool can run it)."""
+    return base64.b64encode(data).decode('ascii')
+
+
 class MediaService:
     """Service for downloading Telegram media as base64."""
     
@@ -138,7 +145,7 @@ class MediaService:
         }
     
     @staticmethod
-    async def process_media(client, message) -> dict | None:
+    async def process_media(client, message, executor: Executor | None = None) -> dict | None:
         """
         Process media from a message - download if allowed, or return violation info.
         
@@ -148,6 +155,8 @@ class MediaService:
         Args:
             client: The Telegram client instance
             message: The Telegram message with media
+            executor: Optional executor (e.g. a process pool) for the base64
+                encoding, so large media do not block the event loop
             
         Returns:
             dict with media data/metadata, or None if no media present
@@ -204,14 +213,21 @@ class MediaService:
             buffer = BytesIO()
             await client.download_media(message, file=buffer)
             
-            media_bytes = buffer.getvalue()
-            base64_data = base64.b64encode(media_bytes).decode('utf-8')
+            if executor is None:
+                # Encode straight from the buffer without copying it
+                media_size = buffer.getbuffer().nbytes
+                base64_data = _encode_base64(buffer.getbuffer())
+            else:
+                media_bytes = buffer.getvalue()
+                media_size = len(media_bytes)
+                loop = asyncio.get_running_loop()
+                base64_data = await loop.run_in_executor(executor, _encode_base64, media_bytes)
             
             result = {
                 "type": media_type,
                 "mime_type": MediaService.get_mime_type(message),
                 "filename": MediaService.get_filename(message),
-                "size": len(media_bytes),
+                "size": media_size,
                 "base64": base64_data,
                 "skipped": False,
                 "violation": None
@@ -4,11 +4,17 @@ Telegram Sender Router - FastAPI endpoints for sending messages to Telegram.
 
 import asyncio
 import logging
+from collections import Counter, defaultdict
+from typing import Any, TypeVar
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError
 
 from services.telegram.config import Config
 from services.telegram.models import (
+    SendMessageItem,
     SendMessagesRequest,
     SendMessagesResponse,
     SendMessageResult,
@@ -24,20 +30,58 @@ from telethon import TelegramClient
 
 logger = logging.getLogger(__name__)
 
+__all__ = ["telegram_sender_router", "init_telegram_sender", "shutdown_telegram_sender"]
+
 # Router instance
 telegram_sender_router = APIRouter(tags=["Telegram Sender"])
 
 # Shared instances (initialized in lifespan)
 _telegram_client: TelegramClient | None = None
 _sender_service: SenderService | None = None
+_typing_service: TypingService | None = None
+
+# Request validators compiled once at import (bodies are parsed with validate_json)
+_SEND_MESSAGES_ADAPTER = TypeAdapter(SendMessagesRequest)
+_START_TYPING_ADAPTER = TypeAdapter(StartTypingRequest)
+_CANCEL_TYPING_ADAPTER = TypeAdapter(CancelTypingRequest)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+async def _parse_body(request: Request, adapter: TypeAdapter[ModelT]) -> ModelT:
+    """Validate the raw JSON body with a precompiled adapter (422 on failure, like FastAPI)."""
+    try:
+        return adapter.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+
+
+def _request_body_openapi(model: type[BaseModel]) -> dict[str, Any]:
+    """OpenAPI requestBody for endpoints that parse their body manually."""
+    schema = model.model_json_schema()
+    defs = schema.pop("$defs", {})
 
-# Typing background tasks (keyed by str(chat_id))
-_typing_tasks: dict[str, asyncio.Task] = {}
+    def _inline(node: Any) -> Any:
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if ref and ref.startswith("#/$defs/"):
+                return _inline(defs[ref.rsplit("/", 1)[-1]])
+            return {key: _inline(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [_inline(item) for item in node]
+        return node
+
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": _inline(schema)}},
+        }
+    }
 
 
 async def init_telegram_sender():
     """Initialize the Telegram client and sender service."""
-    global _telegram_client, _sender_service
+    global _telegram_client, _sender_service, _typing_service
     
     # Create and start sender service
     _sender_service = SenderService()
@@ -52,26 +96,20 @@ async def init_telegram_sender():
     
     # Start the client (will use existing session if available)
     await _telegram_client.start()
+    _typing_service = TypingService(_telegram_client)
     
     me = await _telegram_client.get_me()
-    logger.info(f"Telegram sender initialized as: {me.first_name} (@{me.username or 'no username'})")
+    logger.info("Telegram sender initialized as: %s (@%s)", me.first_name, me.username or "no username")
 
 
 async def shutdown_telegram_sender():
     """Shutdown the Telegram client and sender service."""
-    global _telegram_client, _sender_service, _typing_tasks
-
-    # Cancel typing tasks first (their finally blocks send best-effort 'cancel')
-    if _typing_tasks:
-        tasks = list(_typing_tasks.values())
-        _typing_tasks.clear()
-        for t in tasks:
-            if not t.done():
-                t.cancel()
-        try:
-            await asyncio.gather(*tasks, return_exceptions=True)
-        except Exception:
-            pass
+    global _telegram_client, _sender_service, _typing_service
+
+    # Stop typing first (sends best-effort 'cancel' for active chats)
+    if _typing_service:
+        await _typing_service.stop()
+        _typing_service = None
     
     if _sender_service:
         await _sender_service.stop()
@@ -85,7 +123,7 @@ async def shutdown_telegram_sender():
 
 
 def get_telegram_client() -> TelegramClient:
-    """Get the initialized Telegram client."""
+    """Dependency provider for the initialized Telegram client."""
     if _telegram_client is None:
         raise HTTPException(
             status_code=503,
@@ -95,7 +133,7 @@ def get_telegram_client() -> TelegramClient:
 
 
 def get_sender_service() -> SenderService:
-    """Get the initialized sender service."""
+    """Dependency provider for the initialized sender service."""
     if _sender_service is None:
         raise HTTPException(
             status_code=503,
@@ -104,13 +142,29 @@ def get_sender_service() -> SenderService:
     return _sender_service
 
 
+def get_typing_service() -> TypingService:
+    """Dependency provider for the initialized typing service."""
+    if _typing_service is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Typing service not initialized"
+        )
+    return _typing_service
+
+
 @telegram_sender_router.post(
     "/send",
     response_model=SendMessagesResponse,
+    response_class=ORJSONResponse,
     summary="Send multiple messages with images",
-    description="Send a list of messages to Telegram chats with optional images"
+    description="Send a list of messages to Telegram chats with optional images",
+    openapi_extra=_request_body_openapi(SendMessagesRequest),
 )
-async def send_messages(request: SendMessagesRequest) -> SendMessagesResponse:
+async def send_messages(
+    raw_request: Request,
+    client: TelegramClient = Depends(get_telegram_client),
+    sender: SenderService = Depends(get_sender_service),
+) -> ORJSONResponse:
     """
     Send multiple messages to Telegram chats.
     
@@ -118,95 +172,134 @@ async def send_messages(request: SendMessagesRequest) -> SendMessagesResponse:
     - **chat_id**: Target chat ID to send the message to
     - **image_urls**: Optional list of image URLs (sent as album if multiple)
     - **caption**: Optional caption text
+    
+    The response is returned as an ORJSONResponse so FastAPI does not
+    re-validate it against response_model (kept for the OpenAPI schema).
     """
-    client = get_telegram_client()
-    sender = get_sender_service()
-    
-    results = []
-    successful = 0
-    failed = 0
-    
-    for msg in request.messages:
-        # Validate that at least images or caption is provided
-        has_images = msg.image_urls and len(msg.image_urls) > 0
-        if not has_images and not msg.caption:
-            results.append(SendMessageResult(
+    request = await _parse_body(raw_request, _SEND_MESSAGES_ADAPTER)
+    semaphore = asyncio.Semaphore(Config.MAX_CONCURRENT_SENDS)
+    
+    async def _send_one(msg: SendMessageItem) -> SendMessageResult:
+        async with semaphore:
+            result = await sender.send_message(
+                client=client,
+                chat_id=msg.chat_id,
+                image_urls=msg.image_urls,
+                caption=msg.caption,
+                preuploaded_files=shared_uploads.get(tuple(msg.image_urls or ()))
+            )
+        # Results are built server-side, so skip re-validating them
+        return SendMessageResult.model_construct(**result)
+    
+    # Precheck all messages up front so the send tasks only do network work.
+    # Different chats are sent concurrently, but messages to the same chat
+    # go out one by one to keep their order and avoid per-peer flood waits.
+    results: list[SendMessageResult | None] = [None] * len(request.messages)
+    groups: dict[str, list[tuple[int, SendMessageItem]]] = defaultdict(list)
+    for index, msg in enumerate(request.messages):
+        # At least images or caption must be provided
+        if msg.image_urls or msg.caption:
+            groups[str(msg.chat_id)].append((index, msg))
+        else:
+            results[index] = SendMessageResult.model_construct(
                 success=False,
                 message_ids=[],
                 chat_id=msg.chat_id,
                 error="At least 'image_urls' or 'caption' must be provided"
-            ))
-            failed += 1
-            continue
-        
-        result = await sender.send_message(
-            client=client,
-            chat_id=msg.chat_id,
-            image_urls=msg.image_urls,
-            caption=msg.caption
-        )
-        
-        results.append(SendMessageResult(**result))
-        
-        if result["success"]:
-            successful += 1
+            )
+    
+    # Albums shared by several messages are downloaded and uploaded once,
+    # then sent to each chat by reference. On upload failure those messages
+    # fall back to the regular per-message path.
+    album_counts = Counter(
+        tuple(msg.image_urls)
+        for items in groups.values()
+        for _, msg in items
+        if msg.image_urls
+    )
+    shared_albums = [urls for urls, count in album_counts.items() if count > 1]
+    uploads = await asyncio.gather(
+        *[sender.upload_images(client, list(urls)) for urls in shared_albums],
+        return_exceptions=True
+    )
+    shared_uploads: dict[tuple[str, ...], list] = {}
+    for urls, upload in zip(shared_albums, uploads):
+        if isinstance(upload, BaseException):
+            logger.warning("Failed to pre-upload shared album %s: %s", urls, upload)
         else:
-            failed += 1
+            shared_uploads[urls] = upload
+    
+    async def _send_group(items: list[tuple[int, SendMessageItem]]) -> None:
+        for index, msg in items:
+            results[index] = await _send_one(msg)
+    
+    async with asyncio.TaskGroup() as tg:
+        for items in groups.values():
+            tg.create_task(_send_group(items))
     
-    return SendMessagesResponse(
+    successful = sum(1 for r in results if r.success)
+    
+    response = SendMessagesResponse.model_construct(
         total=len(request.messages),
         successful=successful,
-        failed=failed,
+        failed=len(results) - successful,
         results=results
     )
+    return ORJSONResponse(response.model_dump(mode="json"))
 
 
 @telegram_sender_router.post(
     "/typing/start",
     response_model=StartTypingResponse,
+    response_class=ORJSONResponse,
     summary="Start typing indicator for a duration",
     description="Set chat to typing mode for duration_seconds (returns immediately; runs in background)",
+    openapi_extra=_request_body_openapi(StartTypingRequest),
 )
-async def start_typing(request: StartTypingRequest) -> StartTypingResponse:
-    client = get_telegram_client()
+async def start_typing(
+    raw_request: Request,
+    typing_service: TypingService = Depends(get_typing_service),
+) -> ORJSONResponse:
+    request = await _parse_body(raw_request, _START_TYPING_ADAPTER)
     try:
-        await TypingService.start_typing(
-            client=client,
+        typing_service.start_typing(
             chat_id=request.chat_id,
             duration_seconds=request.duration_seconds,
-            registry=_typing_tasks,
         )
-        return StartTypingResponse(
+        response = StartTypingResponse(
             success=True,
             chat_id=request.chat_id,
             duration_seconds=request.duration_seconds,
             error=None,
         )
+        return ORJSONResponse(response.model_dump(mode="json"))
     except Exception as e:
-        logger.error(f"Failed to start typing for chat {request.chat_id}: {e}")
+        logger.error("Failed to start typing for chat %s: %s", request.chat_id, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @telegram_sender_router.post(
     "/typing/cancel",
     response_model=CancelTypingResponse,
+    response_class=ORJSONResponse,
     summary="Cancel typing indicator immediately",
     description="Cancel typing mode immediately and stop any background typing task for that chat",
+    openapi_extra=_request_body_openapi(CancelTypingRequest),
 )
-async def cancel_typing(request: CancelTypingRequest) -> CancelTypingResponse:
-    client = get_telegram_client()
+async def cancel_typing(
+    raw_request: Request,
+    typing_service: TypingService = Depends(get_typing_service),
+) -> ORJSONResponse:
+    request = await _parse_body(raw_request, _CANCEL_TYPING_ADAPTER)
     try:
-        cancelled_task = await TypingService.cancel_typing(
-            client=client,
-            chat_id=request.chat_id,
-            registry=_typing_tasks,
-        )
-        return CancelTypingResponse(
+        cancelled_task = await typing_service.cancel_typing(chat_id=request.chat_id)
+        response = CancelTypingResponse(
             success=True,
             chat_id=request.chat_id,
             cancelled_task=cancelled_task,
             error=None,
         )
+        return ORJSONResponse(response.model_dump(mode="json"))
     except Exception as e:
-        logger.error(f"Failed to cancel typing for chat {request.chat_id}: {e}")
+        logger.error("Failed to cancel typing for chat %s: %s", request.chat_id, e)
         raise HTTPException(status_code=500, detail=str(e))
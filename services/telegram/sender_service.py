@@ -2,25 +2,70 @@
 Sender Service - Handles sending messages with images to Telegram chats.
 """
 
+import asyncio
 import logging
+import mimetypes
+import os
+from collections import OrderedDict
 from io import BytesIO
 from typing import Optional
 
 import aiohttp
 from telethon import TelegramClient
+from telethon.tl.types import TypeInputFile
 
 logger = logging.getLogger(__name__)
 
+# Max concurrent downloads per download_images call
+MAX_CONCURRENT_DOWNLOADS = 8
+
+# Read size used when streaming image downloads
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Total size cap for the downloaded image cache
+IMAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# File extension per image Content-Type; Telethon derives the media type from the name
+IMAGE_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/jpg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/bmp": ".bmp",
+    "image/heic": ".heic",
+}
+DEFAULT_IMAGE_EXTENSION = ".jpg"
+
 
 class SenderService:
     """Service for sending messages with images to Telegram."""
     
     def __init__(self):
         self.http_session: Optional[aiohttp.ClientSession] = None
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        
+        # URL -> (image bytes, file extension), oldest first
+        self._image_cache: OrderedDict[str, tuple[bytes, str]] = OrderedDict()
+        self._image_cache_bytes = 0
+        # URL -> in-flight download shared by concurrent callers
+        self._pending_downloads: dict[str, asyncio.Future] = {}
     
     async def start(self):
         """Initialize the HTTP session."""
-        self.http_session = aiohttp.ClientSession()
+        # Keep connections and DNS results around so repeated downloads from
+        # the same CDN skip the TCP/TLS handshake and lookup.
+        self._connector = aiohttp.TCPConnector(
+            limit=0,
+            limit_per_host=32,
+            use_dns_cache=True,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+        )
+        self.http_session = aiohttp.ClientSession(
+            connector=self._connector,
+            timeout=aiohttp.ClientTimeout(total=30, connect=5),
+        )
         logger.debug("SenderService HTTP session started")
     
     async def stop(self):
@@ -29,16 +74,25 @@ class SenderService:
             await self.http_session.close()
             self.http_session = None
             logger.debug("SenderService HTTP session closed")
+        if self._connector:
+            await self._connector.close()
+            self._connector = None
+        self._image_cache.clear()
+        self._image_cache_bytes = 0
     
-    async def download_image(self, url: str) -> bytes:
+    async def download_image(self, url: str) -> BytesIO:
         """
         Download an image from a URL.
         
+        Recently downloaded URLs are served from an in-memory LRU cache, and
+        concurrent requests for the same URL share a single download.
+        
         Args:
             url: The URL to download the image from
             
         Returns:
-            The image data as bytes
+            BytesIO positioned at the start of the image data, named with
+            the extension matching the response Content-Type
             
         Raises:
             Exception: If download fails
@@ -46,18 +100,61 @@ class SenderService:
         if not self.http_session:
             raise RuntimeError("SenderService not started. Call start() first.")
         
+        cached = self._image_cache.get(url)
+        if cached is not None:
+            self._image_cache.move_to_end(url)
+            return self._image_file(*cached)
+        
+        pending = self._pending_downloads.get(url)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch_image(url))
+            self._pending_downloads[url] = pending
+            pending.add_done_callback(lambda _: self._pending_downloads.pop(url, None))
+        
+        # Shield so one cancelled caller does not abort the shared download
+        image_data, extension = await asyncio.shield(pending)
+        return self._image_file(image_data, extension)
+    
+    @staticmethod
+    def _image_file(image_data: bytes, extension: str) -> BytesIO:
+        image_file = BytesIO(image_data)
+        image_file.name = f"image{extension}"
+        return image_file
+    
+    async def _fetch_image(self, url: str) -> tuple[bytes, str]:
+        """Download an image and store it in the cache."""
         try:
-            async with self.http_session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+            async with self.http_session.get(url) as response:
                 if response.status != 200:
                     raise Exception(f"Failed to download image: HTTP {response.status}")
                 
-                image_data = await response.read()
-                logger.debug(f"Downloaded image from {url} ({len(image_data)} bytes)")
-                return image_data
+                extension = IMAGE_EXTENSIONS.get(response.content_type, DEFAULT_IMAGE_EXTENSION)
+                
+                # Stream into one buffer instead of materializing response.read()
+                buffer = BytesIO()
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    buffer.write(chunk)
+                image_data = buffer.getvalue()
+                logger.debug("Downloaded image from %s (%d bytes)", url, len(image_data))
                 
         except aiohttp.ClientError as e:
-            logger.error(f"HTTP error downloading image from {url}: {e}")
+            logger.error("HTTP error downloading image from %s: %s", url, e)
             raise Exception(f"Failed to download image: {e}")
+        
+        self._cache_image(url, image_data, extension)
+        return image_data, extension
+    
+    def _cache_image(self, url: str, image_data: bytes, extension: str) -> None:
+        """Insert an image into the LRU cache, evicting the oldest entries over the size cap."""
+        size = len(image_data)
+        if size > IMAGE_CACHE_MAX_BYTES:
+            return
+        
+        self._image_cache[url] = (image_data, extension)
+        self._image_cache_bytes += size
+        while self._image_cache_bytes > IMAGE_CACHE_MAX_BYTES:
+            _, (evicted, _) = self._image_cache.popitem(last=False)
+            self._image_cache_bytes -= len(evicted)
     
     async def download_images(self, urls: list[str]) -> list[BytesIO]:
         """
@@ -69,20 +166,43 @@ class SenderService:
         Returns:
             List of BytesIO objects containing image data
         """
-        image_files = []
-        for i, url in enumerate(urls):
-            image_data = await self.download_image(url)
-            image_file = BytesIO(image_data)
-            image_file.name = f"image_{i}.jpg"
-            image_files.append(image_file)
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+        
+        async def _download(url: str) -> BytesIO:
+            async with semaphore:
+                return await self.download_image(url)
+        
+        image_files = await asyncio.gather(*[_download(url) for url in urls])
+        for i, image_file in enumerate(image_files):
+            extension = os.path.splitext(image_file.name)[1]
+            image_file.name = f"image_{i}{extension}"
         return image_files
     
+    async def upload_images(self, client: TelegramClient, urls: list[str]) -> list[TypeInputFile]:
+        """
+        Download images and upload them to Telegram once.
+        
+        The returned handles can be passed to send_message for several chats
+        without downloading or uploading the images again (Telegram keeps
+        uploaded files for roughly a day).
+        
+        Args:
+            client: The Telegram client instance
+            urls: List of URLs to download images from
+            
+        Returns:
+            List of uploaded file handles, in the same order as urls
+        """
+        image_files = await self.download_images(urls)
+        return await asyncio.gather(*[client.upload_file(f) for f in image_files])
+    
     async def send_message(
         self,
         client: TelegramClient,
         chat_id: int | str,
         image_urls: Optional[list[str]] = None,
-        caption: Optional[str] = None
+        caption: Optional[str] = None,
+        preuploaded_files: Optional[list[TypeInputFile]] = None
     ) -> dict:
         """
         Send a message with images and caption to a Telegram chat.
@@ -94,6 +214,8 @@ class SenderService:
             chat_id: Target chat ID (int) or username (str like '@username')
             image_urls: List of image URLs to send (optional)
             caption: Caption text for the image/message
+            preuploaded_files: Handles from upload_images for image_urls;
+                when given, the download step is skipped
             
         Returns:
             dict with success status, message_ids, and chat_id
@@ -103,14 +225,15 @@ class SenderService:
             
             # If image URLs provided, download and send
             if image_urls and len(image_urls) > 0:
-                image_files = await self.download_images(image_urls)
+                image_files = preuploaded_files or await self.download_images(image_urls)
                 
                 if len(image_files) == 1:
                     # Single image - send as photo with caption
                     message = await client.send_file(
                         chat_id,
                         file=image_files[0],
-                        caption=caption
+                        caption=caption,
+                        mime_type=mimetypes.guess_type(image_files[0].name)[0]
                     )
                     message_ids.append(message.id)
                 else:
@@ -134,7 +257,7 @@ class SenderService:
                 )
                 message_ids.append(message.id)
             
-            logger.info(f"Sent message(s) to chat {chat_id}, message_ids: {message_ids}")
+            logger.info("Sent message(s) to chat %s, message_ids: %s", chat_id, message_ids)
             
             return {
                 "success": True,
@@ -144,7 +267,7 @@ class SenderService:
             }
             
         except Exception as e:
-            logger.error(f"Failed to send message to chat {chat_id}: {e}")
+            logger.error("Failed to send message to chat %s: %s", chat_id, e)
             return {
                 "success": False,
                 "message_ids": [],
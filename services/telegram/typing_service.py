@@ -1,8 +1,10 @@
 """
 Typing Service - Handles Telegram typing indicators (start for duration / cancel).
 
-This uses Telethon's MTProto chat actions:
-    - client.action(chat_id, 'typing') to show typing
+Telegram drops a typing indicator after ~5 seconds, so active chats must be
+renewed periodically. Instead of one sleeping task per chat, a single loop
+renews every active chat in one batch per tick:
+    - SetTypingRequest(peer, SendMessageTypingAction()) to show/renew typing
     - client.action(chat_id, 'cancel') to cancel immediately
 """
 
@@ -10,103 +12,115 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import Any
+from dataclasses import dataclass
 
 from telethon import TelegramClient
+from telethon.tl.functions.messages import SetTypingRequest
+from telethon.tl.types import SendMessageTypingAction
 
 logger = logging.getLogger(__name__)
 
+# Seconds between typing renewals (Telegram expires the indicator after ~5s)
+RENEW_INTERVAL = 4.5
+
+# Chats due for renewal within this many seconds are renewed in the same tick
+RENEW_SLACK = 1.0
+
+
+@dataclass
+class _TypingState:
+    chat_id: int | str
+    deadline: float
+    next_renewal: float
+
 
 class TypingService:
-    """Service for managing per-chat typing background tasks."""
-
-    @staticmethod
-    async def start_typing(
-        *,
-        client: TelegramClient,
-        chat_id: int | str,
-        duration_seconds: int,
-        registry: dict[str, asyncio.Task],
-    ) -> None:
+    """Service that keeps typing indicators alive for many chats from one loop."""
+
+    def __init__(self, client: TelegramClient) -> None:
+        self.client = client
+        # Active chats keyed by str(chat_id)
+        self._active: dict[str, _TypingState] = {}
+        self._wakeup = asyncio.Event()
+        self._loop_task: asyncio.Task | None = None
+
+    def start_typing(self, chat_id: int | str, duration_seconds: int) -> None:
         """
-        Start typing indicator in a chat for a duration (background task).
+        Start typing indicator in a chat for a duration.
 
-        Overlap policy: reset — if a task exists for the same chat_id, cancel it first.
+        Overlap policy: reset — a new call for the same chat_id replaces its deadline.
         """
-        chat_key = str(chat_id)
-
-        existing = registry.get(chat_key)
-        if existing and not existing.done():
-            existing.cancel()
-
-        task = asyncio.create_task(
-            TypingService._typing_task(
-                client=client,
-                chat_id=chat_id,
-                duration_seconds=duration_seconds,
-                registry=registry,
-            ),
-            name=f"telegram-typing:{chat_key}",
+        now = asyncio.get_running_loop().time()
+        self._active[str(chat_id)] = _TypingState(
+            chat_id=chat_id,
+            deadline=now + duration_seconds,
+            next_renewal=now,
         )
-        registry[chat_key] = task
-
-    @staticmethod
-    async def cancel_typing(
-        *,
-        client: TelegramClient,
-        chat_id: int | str,
-        registry: dict[str, asyncio.Task],
-    ) -> bool:
+        self._ensure_loop()
+        self._wakeup.set()
+
+    async def cancel_typing(self, chat_id: int | str) -> bool:
         """
         Cancel typing indicator immediately.
 
-        Returns True if there was a registry task that was cancelled.
+        Returns True if the chat had an active typing indicator.
         """
-        chat_key = str(chat_id)
-        cancelled_task = False
+        cancelled_task = self._active.pop(str(chat_id), None) is not None
+        await self._send_cancel(chat_id)
+        return cancelled_task
 
-        existing = registry.get(chat_key)
-        if existing and not existing.done():
-            existing.cancel()
-            cancelled_task = True
+    async def stop(self) -> None:
+        """Stop the renewal loop and cancel all active indicators (best-effort)."""
+        if self._loop_task:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+
+        states = list(self._active.values())
+        self._active.clear()
+        await asyncio.gather(*[self._send_cancel(s.chat_id) for s in states])
+
+    def _ensure_loop(self) -> None:
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(self._run(), name="telegram-typing")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            now = loop.time()
+
+            expired = [key for key, s in self._active.items() if s.deadline <= now]
+            expired_states = [self._active.pop(key) for key in expired]
+
+            due = [s for s in self._active.values() if s.next_renewal <= now + RENEW_SLACK]
+            for s in due:
+                s.next_renewal = now + RENEW_INTERVAL
+
+            await asyncio.gather(
+                *[self._send_cancel(s.chat_id) for s in expired_states],
+                *[self._send_typing(s.chat_id) for s in due],
+            )
+
+            if not self._active:
+                await self._wakeup.wait()
+                continue
+
+            # Sleep until the next renewal or expiry, or until a chat is added
+            next_tick = min(min(s.next_renewal, s.deadline) for s in self._active.values())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(next_tick - loop.time(), 0))
+            except asyncio.TimeoutError:
+                pass
 
-        # Send immediate cancel to Telegram (best-effort).
+    async def _send_typing(self, chat_id: int | str) -> None:
         try:
-            await client.action(chat_id, "cancel")
+            await self.client(SetTypingRequest(peer=chat_id, action=SendMessageTypingAction()))
         except Exception as e:
-            logger.warning(f"Failed to send typing cancel for chat {chat_id}: {e}")
-
-        return cancelled_task
+            logger.warning("Typing task error for chat %s: %s", chat_id, e)
 
-    @staticmethod
-    async def _typing_task(
-        *,
-        client: TelegramClient,
-        chat_id: int | str,
-        duration_seconds: int,
-        registry: dict[str, asyncio.Task],
-    ) -> None:
-        chat_key = str(chat_id)
-        current_task = asyncio.current_task()
+    async def _send_cancel(self, chat_id: int | str) -> None:
         try:
-            async with client.action(chat_id, "typing"):
-                await asyncio.sleep(duration_seconds)
-        except asyncio.CancelledError:
-            # Reset policy cancels prior task; we still attempt to cancel the typing indicator.
-            raise
+            await self.client.action(chat_id, "cancel")
         except Exception as e:
-            logger.warning(f"Typing task error for chat {chat_id}: {e}")
-        finally:
-            # Best-effort cancellation to avoid lingering indicator.
-            try:
-                await client.action(chat_id, "cancel")
-            except Exception:
-                pass
-
-            # Cleanup registry only if it still points to this task.
-            try:
-                if registry.get(chat_key) is current_task:
-                    registry.pop(chat_key, None)
-            except Exception:
-                # Defensive: registry might be mutated concurrently.
-                pass
+            logger.warning("Failed to send typing cancel for chat %s: %s", chat_id, e)
@@ -1,15 +1,15 @@
-import sys
-import os
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-
 from services.common.milvus_service_base import MilvusServiceBase
+import numpy as np
 from pymilvus import FieldSchema, CollectionSchema, DataType
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Union
 
 
 class DocumentMilvusService(MilvusServiceBase):
     """Milvus service for handling document operations with document_id, and text_content"""
     
+    # Embeddings are stored as half precision to halve storage and scan bandwidth
+    vector_dtype = np.float16
+    
     def __init__(self, uri: str = "http://localhost:19530/", collection_name: str = "documents", logger=None):
         """Initialize Document Milvus service"""
         super().__init__(uri=uri, collection_name=collection_name, logger=logger)
@@ -39,7 +39,7 @@ class DocumentMilvusService(MilvusServiceBase):
             ),
             FieldSchema(
                 name="text_content_embedding", 
-                dtype=DataType.FLOAT_VECTOR, 
+                dtype=DataType.FLOAT16_VECTOR, 
                 dim=self.text_embedding_dimension,
                 description="Vector embedding of the text content"
             ),
@@ -49,7 +49,7 @@ class DocumentMilvusService(MilvusServiceBase):
         schema = CollectionSchema(
             fields=fields,
             description="Document collection for storing documents with embeddings",
-            enable_dynamic_field=True  # Allow additional fields to be added dynamically
+            enable_dynamic_field=False  # Only the declared columns are ever written
         )
         
         return schema
@@ -65,6 +65,13 @@ class DocumentMilvusService(MilvusServiceBase):
             text_content=text_content
         )
     
+    async def save_documents(self, documents: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """Save many (document_id, text_content) pairs with one embedding call and one insert"""
+        return await self.save_records([
+            {"document_id": document_id, "text_content": text_content}
+            for document_id, text_content in documents
+        ])
+    
     async def search_documents_by_text(self, query: str, limit: int = 10, output_fields: List[str] = None) -> Dict[str, Any]:
         """Search documents by text content"""
         if output_fields is None:
@@ -72,8 +79,11 @@ class DocumentMilvusService(MilvusServiceBase):
         
         return await self.search_by_text(query=query, limit=limit, output_fields=output_fields)
     
-    async def search_documents_by_vector(self, query_vector: List[float], limit: int = 10, output_fields: List[str] = None) -> Dict[str, Any]:
+    async def search_documents_by_vector(self, query_vector: Union[List[float], np.ndarray], limit: int = 10, output_fields: List[str] = None) -> Dict[str, Any]:
         """Search documents by vector similarity"""
+        # Convert the request's float list to the collection dtype once; the
+        # base search reuses the array as is
+        query_vector = self._as_query_vector(query_vector)
         if output_fields is None:
             output_fields = ["document_id", "text_content"]
         
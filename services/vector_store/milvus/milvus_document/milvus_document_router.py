@@ -1,21 +1,25 @@
-import sys
-import os
-sys.path.append(os.path.join(os.path.dirname(__file__),'..', '..' , '..', '..','..'))
-
-from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, Response
 from services.common.decorators import response_formatter
 from services.vector_store.milvus.milvus_document.document_service import DocumentMilvusService
 from services.vector_store.milvus.milvus_document.models import (
     DocumentSaveRequest, 
+    DocumentBatchSaveRequest,
     DocumentSearchRequest, 
     DocumentVectorSearchRequest,
     DocumentDeleteRequest,
     DocumentCountRequest,
-    DocumentResponse
+    DocumentResponse,
+    DOCUMENT_VECTOR_SEARCH_ADAPTER
 )
+from pydantic import ValidationError
 import os
-from typing import List, Optional
+import base64
+import orjson
+import binascii
+import numpy as np
+from typing import Any, Dict, List, Optional
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -29,161 +33,199 @@ document_service = DocumentMilvusService(
     collection_name=os.getenv("COLLECTION_NAME", "documents")
 )
 
+# Static health body, encoded once at import
+_HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "Document Milvus Service"})
+
+
+def _document_response(message: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Success envelope matching DocumentResponse, built without model validation"""
+    return {"success": True, "message": message, "data": data, "error": None}
+
+
+def _decode_query_vector(data: bytes) -> np.ndarray:
+    """Read a query vector sent as little-endian float32 bytes without per-element parsing"""
+    if not data or len(data) % 4:
+        raise HTTPException(status_code=400, detail="Query vector must be a non-empty sequence of float32 values")
+    return np.frombuffer(data, dtype="<f4")
+
+
+async def _parse_vector_search_request(request: Request) -> DocumentVectorSearchRequest:
+    """Validate the raw JSON body with the precompiled adapter (422 on failure, like FastAPI)"""
+    try:
+        return DOCUMENT_VECTOR_SEARCH_ADAPTER.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+
+
 # Create FastAPI app
 milvus_document_router = APIRouter(
-    prefix="/v1"
+    prefix="/v1",
+    default_response_class=ORJSONResponse
 )
 
 @milvus_document_router.post("", response_model=DocumentResponse)
 @response_formatter
 async def save_document(request: DocumentSaveRequest):
     """Save a document to the Milvus collection"""
-    try:
-        document_service.logger.info(f"Saving document with ID: {request.document_id}")
-        
-        result = await document_service.save_document(
-            document_id=request.document_id,
-            text_content=request.text_content
-        )
-        
-        if result.get("success", False):
-            return JSONResponse(content=DocumentResponse(
-                success=True,
-                message="Document saved successfully",
-                data=result
-            ).model_dump())
-        else:
-            raise HTTPException(status_code=500, detail=result.get("error", "Failed to save document"))
-            
-    except Exception as e:
-        document_service.logger.error(f"Error saving document: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    document_service.logger.info(f"Saving document with ID: {request.document_id}")
+    
+    result = await document_service.save_document(
+        document_id=request.document_id,
+        text_content=request.text_content
+    )
+    
+    if not result.get("success", False):
+        raise HTTPException(status_code=500, detail=result.get("error", "Failed to save document"))
+    return ORJSONResponse(content=_document_response("Document saved successfully", result))
+
+
+@milvus_document_router.post("/batch", response_model=DocumentResponse)
+@response_formatter
+async def save_documents(request: DocumentBatchSaveRequest):
+    """Save many documents with a single embedding call and Milvus insert"""
+    document_service.logger.info(f"Saving {len(request.documents)} documents")
+    
+    result = await document_service.save_documents(
+        [(document.document_id, document.text_content) for document in request.documents]
+    )
+    
+    if not result.get("success", False):
+        raise HTTPException(status_code=500, detail=result.get("error", "Failed to save documents"))
+    return ORJSONResponse(content=_document_response("Documents saved successfully", result))
 
 
 @milvus_document_router.post("/search", response_model=DocumentResponse)
 @response_formatter
 async def search_documents(request: DocumentSearchRequest):
     """Search documents by text query"""
+    document_service.logger.info(f"Searching documents with query: {request.query[:100]}...")
+    
+    result = await document_service.search_documents_by_text(
+        query=request.query,
+        limit=request.limit,
+        output_fields=request.output_fields
+    )
+    
+    if not result.get("success", False):
+        raise HTTPException(status_code=500, detail=result.get("error", "Search failed"))
+    return ORJSONResponse(content=_document_response(f"Found {result.get('count', 0)} documents", result))
+
+
+@milvus_document_router.post(
+    "/search-vector",
+    response_model=DocumentResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": DocumentVectorSearchRequest.model_json_schema()}},
+        }
+    },
+)
+@response_formatter
+async def search_documents_by_vector(request: DocumentVectorSearchRequest = Depends(_parse_vector_search_request)):
+    """Search documents by vector similarity"""
+    document_service.logger.info(f"Searching documents with vector similarity, limit: {request.limit}")
+    
+    if request.query_vector_b64 is not None:
+        try:
+            query_vector = _decode_query_vector(base64.b64decode(request.query_vector_b64, validate=True))
+        except binascii.Error:
+            raise HTTPException(status_code=400, detail="query_vector_b64 is not valid base64")
+    else:
+        query_vector = request.query_vector
+    
     try:
-        document_service.logger.info(f"Searching documents with query: {request.query[:100]}...")
-        
-        result = await document_service.search_documents_by_text(
-            query=request.query,
+        result = await document_service.search_documents_by_vector(
+            query_vector=query_vector,
             limit=request.limit,
             output_fields=request.output_fields
         )
-        
-        if result.get("success", False):
-            return JSONResponse(content=DocumentResponse(
-                success=True,
-                message=f"Found {result.get('count', 0)} documents",
-                data=result
-            ).model_dump())
-        else:
-            raise HTTPException(status_code=500, detail=result.get("error", "Search failed"))
-            
-    except Exception as e:
-        document_service.logger.error(f"Error searching documents: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@milvus_document_router.post("/search-vector", response_model=DocumentResponse)
+    except ValueError as e:
+        # Wrong vector dimension
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not result.get("success", False):
+        raise HTTPException(status_code=500, detail=result.get("error", "Vector search failed"))
+    return ORJSONResponse(content=_document_response(f"Found {result.get('count', 0)} similar documents", result))
+
+
+@milvus_document_router.post(
+    "/search-vector/raw",
+    response_model=DocumentResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "description": "Query vector as little-endian float32 bytes",
+            "content": {"application/octet-stream": {"schema": {"type": "string", "format": "binary"}}},
+        }
+    },
+)
 @response_formatter
-async def search_documents_by_vector(request: DocumentVectorSearchRequest):
-    """Search documents by vector similarity"""
+async def search_documents_by_raw_vector(
+    request: Request,
+    limit: int = 10,
+    output_fields: Optional[List[str]] = Query(None)
+):
+    """Search documents by vector similarity, reading the vector from the raw request body"""
+    query_vector = _decode_query_vector(await request.body())
+    document_service.logger.info(f"Searching documents with raw vector similarity, limit: {limit}")
+    
     try:
-        document_service.logger.info(f"Searching documents with vector similarity, limit: {request.limit}")
-        
         result = await document_service.search_documents_by_vector(
-            query_vector=request.query_vector,
-            limit=request.limit,
-            output_fields=request.output_fields
+            query_vector=query_vector,
+            limit=limit,
+            output_fields=output_fields
         )
-        
-        if result.get("success", False):
-            return JSONResponse(content=DocumentResponse(
-                success=True,
-                message=f"Found {result.get('count', 0)} similar documents",
-                data=result
-            ).model_dump())
-        else:
-            raise HTTPException(status_code=500, detail=result.get("error", "Vector search failed"))
-            
-    except Exception as e:
-        document_service.logger.error(f"Error in vector search: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    except ValueError as e:
+        # Wrong vector dimension
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not result.get("success", False):
+        raise HTTPException(status_code=500, detail=result.get("error", "Vector search failed"))
+    return ORJSONResponse(content=_document_response(f"Found {result.get('count', 0)} similar documents", result))
 
 
 @milvus_document_router.delete("", response_model=DocumentResponse)
 @response_formatter
 async def delete_documents(request: DocumentDeleteRequest):
     """Delete documents based on filter expression"""
-    try:
-        document_service.logger.info(f"Deleting documents with filter: {request.filter_expression}")
-        
-        result = document_service.delete_documents(request.filter_expression)
-        
-        if result.get("success", False):
-            return JSONResponse(content=DocumentResponse(
-                success=True,
-                message="Documents deleted successfully",
-                data=result
-            ).model_dump())
-        else:
-            raise HTTPException(status_code=500, detail=result.get("error", "Delete operation failed"))
-            
-    except Exception as e:
-        document_service.logger.error(f"Error deleting documents: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    document_service.logger.info(f"Deleting documents with filter: {request.filter_expression}")
+    
+    result = document_service.delete_documents(request.filter_expression)
+    
+    if not result.get("success", False):
+        raise HTTPException(status_code=500, detail=result.get("error", "Delete operation failed"))
+    return ORJSONResponse(content=_document_response("Documents deleted successfully", result))
 
 
 @milvus_document_router.post("/count", response_model=DocumentResponse)
 @response_formatter
 async def count_documents(request: DocumentCountRequest):
     """Count documents in the collection"""
-    try:
-        document_service.logger.info(f"Counting documents with filter: {request.filter_expression}")
-        
-        result = document_service.count_documents(request.filter_expression)
-        
-        if result.get("success", False):
-            return JSONResponse(content=DocumentResponse(
-                success=True,
-                message=f"Count completed",
-                data=result
-            ).model_dump())
-        else:
-            raise HTTPException(status_code=500, detail=result.get("error", "Count operation failed"))
-            
-    except Exception as e:
-        document_service.logger.error(f"Error counting documents: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    document_service.logger.info(f"Counting documents with filter: {request.filter_expression}")
+    
+    result = document_service.count_documents(request.filter_expression)
+    
+    if not result.get("success", False):
+        raise HTTPException(status_code=500, detail=result.get("error", "Count operation failed"))
+    return ORJSONResponse(content=_document_response(f"Count completed", result))
 
 
 @milvus_document_router.get("/info", response_model=DocumentResponse)
 @response_formatter
 async def get_collection_info():
     """Get information about the documents collection"""
-    try:
-        document_service.logger.info("Getting collection information")
-        
-        result = document_service.get_documents_info()
-        
-        return JSONResponse(content=DocumentResponse(
-            success=True,
-            message="Collection info retrieved successfully",
-            data=result
-        ).model_dump())
-        
-    except Exception as e:
-        document_service.logger.error(f"Error getting collection info: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    document_service.logger.info("Getting collection information")
+    
+    result = document_service.get_documents_info()
+    
+    return ORJSONResponse(content=_document_response("Collection info retrieved successfully", result))
 
 
 @milvus_document_router.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "Document Milvus Service"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 
 # Example usage and testing
@@ -193,5 +235,7 @@ if __name__ == "__main__":
     # Test the service
     document_service.logger.info("Starting Document Milvus Service")
     
-    # Run the FastAPI app
-    uvicorn.run(app, host="0.0.0.0", port=8005) 
\ No newline at end of file
+    # Run the router in a standalone FastAPI app
+    app = FastAPI(title="Document Milvus Service", default_response_class=ORJSONResponse)
+    app.include_router(milvus_document_router)
+    uvicorn.run(app, host="0.0.0.0", port=8005, loop="uvloop", http="httptools") 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, StrictFloat, TypeAdapter, model_validator
 from typing import List, Optional, Dict, Any
 
 
@@ -8,6 +8,11 @@ class DocumentSaveRequest(BaseModel):
     text_content: str
 
 
+class DocumentBatchSaveRequest(BaseModel):
+    """Request model for saving many documents at once"""
+    documents: List[DocumentSaveRequest]
+
+
 class DocumentSearchRequest(BaseModel):
     """Request model for searching documents"""
     query: str
@@ -16,11 +21,27 @@ class DocumentSearchRequest(BaseModel):
 
 
 class DocumentVectorSearchRequest(BaseModel):
-    """Request model for vector-based document search"""
-    query_vector: List[float]
+    """Request model for vector-based document search
+    
+    Send either query_vector, or query_vector_b64 holding the base64 of the
+    vector as little-endian float32 bytes (skips building a float per element).
+    """
+    # Strict floats skip per-element coercion from strings/bools
+    query_vector: Optional[List[StrictFloat]] = None
+    query_vector_b64: Optional[str] = None
     limit: Optional[int] = 10
     output_fields: Optional[List[str]] = None
 
+    @model_validator(mode="after")
+    def _require_query_vector(self):
+        if (self.query_vector is None) == (self.query_vector_b64 is None):
+            raise ValueError("Exactly one of 'query_vector' or 'query_vector_b64' must be provided")
+        return self
+
+
+# Compiled once at import; the vector search route validates raw JSON bodies with it
+DOCUMENT_VECTOR_SEARCH_ADAPTER = TypeAdapter(DocumentVectorSearchRequest)
+
 
 class DocumentDeleteRequest(BaseModel):
     """Request model for deleting documents"""
@@ -0,0 +1,60 @@
+"""
+Search collator - coalesces concurrent identical vector store searches.
+
+OpenAI embeds the query server-side and vector_stores.search takes one
+query per call, so the collator cannot batch different queries into one
+embedding. Instead, requests with the same (workspace_id, query,
+max_num_results) that arrive while a search is in flight share its result.
+
+Completed results can also be reused for a short TTL, but invalidation only
+reaches the process that changed the files, so with several workers other
+processes may serve stale results until the TTL runs out. Result caching is
+therefore off unless SEARCH_CACHE_ENABLED=yes.
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, Tuple
+
+from cachetools import TTLCache
+
+SearchKey = Tuple[str, str, int]
+
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "no").lower() == "yes"
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "60"))  # seconds
+
+
+class SearchCollator:
+    def __init__(self, search: Callable[[str, str, int], Awaitable[dict]],
+                 cache_size: int = SEARCH_CACHE_SIZE, cache_ttl: int = SEARCH_CACHE_TTL,
+                 cache_enabled: bool = SEARCH_CACHE_ENABLED):
+        self._search = search
+        self._cache_enabled = cache_enabled
+        self._pending: Dict[SearchKey, asyncio.Future] = {}
+        self._results: TTLCache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+
+    async def search(self, workspace_id: str, query: str, max_num_results: int = 20) -> dict:
+        """Search, reusing a recent result or joining an identical in-flight search."""
+        key = (workspace_id, query, max_num_results)
+        cached = self._results.get(key)
+        if cached is not None:
+            return cached
+
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._search(workspace_id, query, max_num_results))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda future: self._finish(key, future))
+
+        # Shield so a disconnected client does not cancel the search for the others
+        return await asyncio.shield(pending)
+
+    def invalidate(self, workspace_id: str):
+        """Drop cached results for a workspace after its files change."""
+        for key in [key for key in self._results.keys() if key[0] == workspace_id]:
+            self._results.pop(key, None)
+
+    def _finish(self, key: SearchKey, future: asyncio.Future):
+        self._pending.pop(key, None)
+        if self._cache_enabled and not future.cancelled() and future.exception() is None:
+            self._results[key] = future.result()
@@ -1,6 +1,11 @@
+import asyncio
 import psycopg2
 import os
+import threading
+from contextlib import contextmanager
 from typing import Optional
+from cachetools import TTLCache
+from psycopg2.pool import ThreadedConnectionPool
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -12,16 +17,60 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "vector_store_db")
 DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "16"))
+VS_ID_CACHE_SIZE = int(os.getenv("VS_ID_CACHE_SIZE", "10000"))
+VS_ID_CACHE_TTL = int(os.getenv("VS_ID_CACHE_TTL", "300"))  # seconds
 
+# Process-wide connection pool (created lazily, closed with close_pool)
+_pool: Optional[ThreadedConnectionPool] = None
+_pool_lock = threading.Lock()
+# ThreadedConnectionPool raises when exhausted; make callers wait instead
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+
+# workspace_id -> vector_store_id; the mapping almost never changes
+_vs_id_cache: TTLCache = TTLCache(maxsize=VS_ID_CACHE_SIZE, ttl=VS_ID_CACHE_TTL)
+_vs_id_cache_lock = threading.RLock()
+
+def _get_pool() -> ThreadedConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(
+                    minconn=DB_POOL_MIN,
+                    maxconn=DB_POOL_MAX,
+                    host=DB_HOST,
+                    port=DB_PORT,
+                    database=DB_NAME,
+                    user=DB_USER,
+                    password=DB_PASSWORD
+                )
+    return _pool
+
+@contextmanager
 def get_connection():
-    """Get a PostgreSQL database connection."""
-    return psycopg2.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        database=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD
-    )
+    """Borrow a PostgreSQL connection from the pool."""
+    pool = _get_pool()
+    with _pool_slots:
+        conn = pool.getconn()
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            # Drop broken connections instead of returning them to the pool
+            pool.putconn(conn, close=bool(conn.closed))
+
+def close_pool():
+    """Close all pooled connections."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
 
 # --- Query Functions ---
 def query_get_vector_store_id(conn, workspace_id: str):
@@ -41,34 +90,108 @@ def query_set_vector_store_id(conn, workspace_id: str, vector_store_id: str):
     """, (workspace_id, vector_store_id))
     cursor.close()
 
+def query_get_sync_fingerprint(conn, workspace_id: str):
+    cursor = conn.cursor()
+    cursor.execute("SELECT sync_fingerprint FROM vector_store_map WHERE workspace_id = %s", (workspace_id,))
+    result = cursor.fetchone()
+    cursor.close()
+    return result
+
+def query_set_sync_fingerprint(conn, workspace_id: str, fingerprint: Optional[str]):
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE vector_store_map SET sync_fingerprint = %s WHERE workspace_id = %s",
+        (fingerprint, workspace_id)
+    )
+    cursor.close()
+
 # --- Public API ---
 def init_db():
     """Initialize the database schema if it doesn't exist."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Create the vector_store_map table if it doesn't exist
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS vector_store_map (
-            workspace_id TEXT PRIMARY KEY,
-            vector_store_id TEXT NOT NULL
-        )
-    """)
-    
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        # Create the vector_store_map table if it doesn't exist
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS vector_store_map (
+                workspace_id TEXT PRIMARY KEY,
+                vector_store_id TEXT NOT NULL,
+                sync_fingerprint TEXT
+            )
+        """)
+        # Tables created before sync fingerprints were stored
+        cursor.execute("""
+            ALTER TABLE vector_store_map ADD COLUMN IF NOT EXISTS sync_fingerprint TEXT
+        """)
+
+        conn.commit()
+        cursor.close()
+
+def _cached_vector_store_id(workspace_id: str) -> Optional[str]:
+    with _vs_id_cache_lock:
+        return _vs_id_cache.get(workspace_id)
+
+def _cache_vector_store_id(workspace_id: str, vector_store_id: str):
+    with _vs_id_cache_lock:
+        _vs_id_cache[workspace_id] = vector_store_id
+
+def invalidate_vector_store_id(workspace_id: str):
+    """Drop a cached workspace -> vector store mapping."""
+    with _vs_id_cache_lock:
+        _vs_id_cache.pop(workspace_id, None)
 
 def get_vector_store_id(workspace_id: str) -> Optional[str]:
     """Get vector store ID for a given workspace ID."""
-    conn = get_connection()
-    row = query_get_vector_store_id(conn, workspace_id)
-    conn.close()
+    cached = _cached_vector_store_id(workspace_id)
+    if cached:
+        return cached
+
+    with get_connection() as conn:
+        row = query_get_vector_store_id(conn, workspace_id)
+        # End the read transaction so the pooled connection is not left idle in one
+        conn.rollback()
+
+    # Misses are not cached so a store created by another process shows up at once
+    if row:
+        _cache_vector_store_id(workspace_id, row[0])
     return row[0] if row else None
 
 def set_vector_store_id(workspace_id: str, vector_store_id: str):
     """Set vector store ID for a given workspace ID."""
-    conn = get_connection()
-    query_set_vector_store_id(conn, workspace_id, vector_store_id)
-    conn.commit()
-    conn.close() 
\ No newline at end of file
+    with get_connection() as conn:
+        query_set_vector_store_id(conn, workspace_id, vector_store_id)
+        conn.commit()
+    _cache_vector_store_id(workspace_id, vector_store_id)
+
+async def aget_vector_store_id(workspace_id: str) -> Optional[str]:
+    """Async get_vector_store_id that runs the query in a worker thread."""
+    # Serve cache hits without a thread hop
+    cached = _cached_vector_store_id(workspace_id)
+    if cached:
+        return cached
+    return await asyncio.to_thread(get_vector_store_id, workspace_id)
+
+async def aset_vector_store_id(workspace_id: str, vector_store_id: str):
+    """Async set_vector_store_id that runs the query in a worker thread."""
+    await asyncio.to_thread(set_vector_store_id, workspace_id, vector_store_id)
+
+def get_sync_fingerprint(workspace_id: str) -> Optional[str]:
+    """Get the document list fingerprint of the workspace's last complete sync."""
+    with get_connection() as conn:
+        row = query_get_sync_fingerprint(conn, workspace_id)
+        conn.rollback()
+    return row[0] if row else None
+
+def set_sync_fingerprint(workspace_id: str, fingerprint: Optional[str]):
+    """Record (or with None, clear) the workspace's last complete sync fingerprint."""
+    with get_connection() as conn:
+        query_set_sync_fingerprint(conn, workspace_id, fingerprint)
+        conn.commit()
+
+async def aget_sync_fingerprint(workspace_id: str) -> Optional[str]:
+    """Async get_sync_fingerprint that runs the query in a worker thread."""
+    return await asyncio.to_thread(get_sync_fingerprint, workspace_id)
+
+async def aset_sync_fingerprint(workspace_id: str, fingerprint: Optional[str]):
+    """Async set_sync_fingerprint that runs the query in a worker thread."""
+    await asyncio.to_thread(set_sync_fingerprint, workspace_id, fingerprint)
@@ -1,18 +1,23 @@
-import os, sys
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from db import init_db
-from vector_store_router import openai_vector_store_router
+from fastapi.responses import ORJSONResponse
+from services.vector_store.openai.db import init_db, close_pool
+from services.vector_store.openai.vector_store_router import openai_vector_store_router, sync_worker_pool
+from services.vector_store.openai.vector_store_service import vector_store_service
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     init_db()
+    await sync_worker_pool.start()
     yield
-    # Shutdown (if needed)
+    # Shutdown
+    await sync_worker_pool.stop()
+    await vector_store_service.close()
+    close_pool()
 
-app = FastAPI(title="OpenAI Vector Store Service", lifespan=lifespan)
+app = FastAPI(title="OpenAI Vector Store Service", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Include the vector store router
 app.include_router(openai_vector_store_router, prefix="/api/v1")
@@ -20,4 +25,18 @@ app.include_router(openai_vector_store_router, prefix="/api/v1")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("openai_vector_store_service:app", host="0.0.0.0", port=8090, reload=True)
+    # Run from the repository root: python -m services.vector_store.openai.openai_vector_store_service
+    is_production = os.getenv("IS_PRODUCTION", "no") == "yes"
+    uvicorn.run(
+        "services.vector_store.openai.openai_vector_store_service:app",
+        host="0.0.0.0",
+        port=8090,
+        loop="uvloop",
+        http="httptools",
+        # Reload for development (reload ignores workers). Caches, single-flight
+        # maps, the sync queue and the DB pool are per process, so extra workers
+        # can serve stale data and create duplicate vector stores; raise
+        # WORKERS only with the result caches off and stores pre-created.
+        reload=not is_production,
+        workers=int(os.getenv("WORKERS", 1)) if is_production else None
+    )
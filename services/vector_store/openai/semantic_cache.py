@@ -0,0 +1,83 @@
+"""
+Semantic search cache - reuses vector store search results for near-duplicate queries.
+
+Queries are embedded locally (through the shared, content-cached embedding
+service) and compared by cosine similarity against recent queries for the
+same workspace. A match above the threshold returns the stored result
+instead of calling vector_stores.search again.
+
+The extra embedding call only pays off for workloads with many rephrased
+questions, so the cache is off unless SEMANTIC_CACHE_ENABLED=yes.
+"""
+import os
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+from cachetools import TTLCache
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "no").lower() == "yes"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "600"))  # seconds
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "256"))  # per workspace
+
+# (unit query embedding, max_num_results, result, expires_at)
+CacheEntry = Tuple[np.ndarray, int, dict, float]
+
+
+async def embed_query(query: str) -> List[float]:
+    """Embed a search query with the shared embedding service."""
+    # Imported lazily so litellm is only loaded when the cache is enabled
+    from services.embedding.openai.embedding_service import create_embeddings
+    from services.embedding.openai.models import Item
+
+    embeddings = await create_embeddings(Item(contents=[{"query": query}], features=["query"]))
+    return embeddings[0]["embedding"]
+
+
+class SemanticCache:
+    def __init__(self, embed: Callable[[str], Awaitable[List[float]]] = embed_query,
+                 threshold: float = SEMANTIC_CACHE_THRESHOLD, ttl: int = SEMANTIC_CACHE_TTL,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        self._embed = embed
+        self._threshold = threshold
+        self._ttl = ttl
+        self._max_entries = max_entries
+        # workspace_id -> entries, oldest first; idle workspaces expire as a whole
+        self._entries: TTLCache = TTLCache(maxsize=1024, ttl=ttl)
+
+    async def embed(self, query: str) -> np.ndarray:
+        """Embed a query as a unit-length float32 vector."""
+        vector = np.asarray(await self._embed(query), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, workspace_id: str, embedding: np.ndarray, max_num_results: int) -> Optional[dict]:
+        """Return the stored result of the most similar recent query, if similar enough."""
+        now = time.monotonic()
+        entries = [
+            entry for entry in self._entries.get(workspace_id, [])
+            if entry[3] > now and entry[1] == max_num_results
+        ]
+        if not entries:
+            return None
+
+        similarities = np.stack([entry[0] for entry in entries]) @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self._threshold:
+            return None
+        return entries[best][2]
+
+    def store(self, workspace_id: str, embedding: np.ndarray, max_num_results: int, result: dict):
+        """Remember a search result for later near-duplicate queries."""
+        now = time.monotonic()
+        entries: List[CacheEntry] = [
+            entry for entry in self._entries.get(workspace_id, []) if entry[3] > now
+        ]
+        entries.append((embedding, max_num_results, result, now + self._ttl))
+        self._entries[workspace_id] = entries[-self._max_entries:]
+
+    def invalidate(self, workspace_id: str):
+        """Drop cached results for a workspace after its files change."""
+        self._entries.pop(workspace_id, None)
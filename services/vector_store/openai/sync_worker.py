@@ -0,0 +1,70 @@
+"""
+Sync worker pool - runs queued sync_files requests on a fixed set of workers.
+
+Each /sync-files call used to spawn its own background task, so a burst of
+requests turned into an unbounded number of concurrent syncs. Requests now
+go into a bounded queue drained by SYNC_WORKERS consumers started in the
+application lifespan.
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable, List, Optional
+
+from dotenv import load_dotenv
+
+from services.vector_store.openai.models import SyncRequest
+
+load_dotenv(override=True)
+SYNC_WORKERS = int(os.getenv("SYNC_WORKERS", "4"))
+SYNC_QUEUE_SIZE = int(os.getenv("SYNC_QUEUE_SIZE", "1000"))
+
+
+class SyncWorkerPool:
+    def __init__(self, sync: Callable[[SyncRequest], Awaitable[object]], logger,
+                 workers: int = SYNC_WORKERS, queue_size: int = SYNC_QUEUE_SIZE):
+        self._sync = sync
+        self._logger = logger
+        self._workers = workers
+        self._queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """Start the worker tasks (call from the application lifespan)."""
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"vector-store-sync-{i}")
+            for i in range(self._workers)
+        ]
+        self._logger.info(f"Started {self._workers} vector store sync workers")
+
+    async def stop(self):
+        """Stop the workers; syncs still waiting in the queue are dropped."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._queue is not None and not self._queue.empty():
+            self._logger.warning(f"Dropped {self._queue.qsize()} queued syncs on shutdown")
+        self._queue = None
+
+    def submit(self, request: SyncRequest):
+        """Queue a sync request.
+
+        Raises:
+            RuntimeError: If the pool has not been started
+            asyncio.QueueFull: If the queue is at capacity
+        """
+        if self._queue is None:
+            raise RuntimeError("SyncWorkerPool not started. Call start() first.")
+        self._queue.put_nowait(request)
+
+    async def _worker(self):
+        while True:
+            request = await self._queue.get()
+            try:
+                await self._sync(request)
+            except Exception as e:
+                self._logger.error(f"Background sync failed for workspace {request.workspace_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
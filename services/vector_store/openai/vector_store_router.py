@@ -1,19 +1,44 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Body, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Body, UploadFile, File, Form
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Optional
 
-from services.vector_store.openai.vector_store_service import vector_store_service
+from services.vector_store.openai.vector_store_service import (
+    vector_store_service, logger, SYNC_MAX_BATCH, SEARCH_MAX_QUERY_LENGTH
+)
+from services.vector_store.openai.batcher import SearchCollator
+from services.vector_store.openai.sync_worker import SyncWorkerPool
 from services.vector_store.openai.models import SyncRequest
 from services.common.decorators import response_formatter
 
-openai_vector_store_router = APIRouter(tags=["openai_vector_store"])
+openai_vector_store_router = APIRouter(tags=["openai_vector_store"], default_response_class=ORJSONResponse)
+
+# Identical searches share one upstream call and are cached briefly
+search_collator = SearchCollator(vector_store_service.search_vector_store)
+
+
+def _invalidate_search(workspace_id: str):
+    search_collator.invalidate(workspace_id)
+    vector_store_service.invalidate_search_cache(workspace_id)
+
+
+async def _sync_files(request: SyncRequest):
+    await vector_store_service.sync_files(request)
+    _invalidate_search(request.workspace_id)
+
+
+# Sync requests run on a fixed set of workers (started in the app lifespan)
+sync_worker_pool = SyncWorkerPool(_sync_files, logger)
 
 
 class VectorStoreSearchRequest(BaseModel):
     workspace_id: str
     query: str
     max_num_results: Optional[int] = 20
+    # Skip the result caches and always query the vector store
+    no_cache: Optional[bool] = False
 
 
 class DeleteFileRequest(BaseModel):
@@ -28,29 +53,31 @@ class DeleteFileByNameRequest(BaseModel):
 
 @openai_vector_store_router.post("/sync-files")
 @response_formatter
-async def sync_files(request: SyncRequest, background_tasks: BackgroundTasks):
-    """Sync files to OpenAI vector store in background."""
-    background_tasks.add_task(sync_file_background, request)
-    return JSONResponse(content={"message": "Sync started in background."}, status_code=200)
-
-
-async def sync_file_background(request: SyncRequest):
-    """Background task for syncing files."""
+async def sync_files(request: SyncRequest):
+    """Queue a sync of files to the OpenAI vector store."""
+    # Reject oversized syncs before queueing any work (an empty list is a
+    # valid sync that removes every file from the store)
+    if len(request.documents) > SYNC_MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"Too many documents: {len(request.documents)} (max {SYNC_MAX_BATCH})")
     try:
-        result = await vector_store_service.sync_files(request)
-        #return JSONResponse(result)
-    except Exception as e:
-        print(f"Background sync failed: {str(e)}")
-
+        sync_worker_pool.submit(request)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Sync queue is full, retry later")
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return ORJSONResponse(content={"message": "Sync started in background."}, status_code=200)
 
 
 @openai_vector_store_router.get("/{workspace_id}/status")
 @response_formatter
-async def get_workspace_status(workspace_id: str):
-    """Get the status of a vector store by workspace ID."""
+async def get_workspace_status(workspace_id: str, include_files: bool = False):
+    """Get the status of a vector store by workspace ID.
+
+    Per-file statuses are only listed when include_files is true.
+    """
     try:
-        result = await vector_store_service.get_vector_store_status_by_workspace(workspace_id)
-        return JSONResponse(content=result.model_dump(), status_code=200)
+        result = await vector_store_service.get_vector_store_status_by_workspace(workspace_id, include_files)
+        return ORJSONResponse(content=result.model_dump(), status_code=200)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -63,7 +90,7 @@ async def get_workspace_files(workspace_id: str):
     """Get all files in a workspace with detailed information."""
     try:
         result = await vector_store_service.get_workspace_files(workspace_id)
-        return JSONResponse(content=result.model_dump(), status_code=200)
+        return ORJSONResponse(content=result.model_dump(), status_code=200)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -74,13 +101,25 @@ async def get_workspace_files(workspace_id: str):
 @response_formatter
 async def vector_store_search(request: VectorStoreSearchRequest = Body(...)):
     """Search a vector store for documents matching the query."""
+    if not request.query.strip():
+        raise HTTPException(status_code=400, detail="Query must not be empty")
+    if len(request.query) > SEARCH_MAX_QUERY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Query too long (max {SEARCH_MAX_QUERY_LENGTH} characters)")
     try:
-        result = await vector_store_service.search_vector_store(
-            request.workspace_id, 
-            request.query, 
-            request.max_num_results
-        )
-        return JSONResponse(content=result, status_code=200)
+        if request.no_cache:
+            result = await vector_store_service.search_vector_store(
+                request.workspace_id,
+                request.query,
+                request.max_num_results,
+                no_cache=True
+            )
+        else:
+            result = await search_collator.search(
+                request.workspace_id, 
+                request.query, 
+                request.max_num_results
+            )
+        return ORJSONResponse(content=result, status_code=200)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -95,13 +134,15 @@ async def insert_file(
 ):
     """Insert a single file into the vector store."""
     try:
-        file_content = await file.read()
+        # Hand the spooled upload (memory below 1 MB, disk above) straight to
+        # the OpenAI client instead of reading it into one bytes object
         result = await vector_store_service.insert_file(
             workspace_id, 
-            file_content, 
+            file.file, 
             file.filename
         )
-        return JSONResponse(content=result.model_dump(), status_code=200)
+        _invalidate_search(workspace_id)
+        return ORJSONResponse(content=result.model_dump(), status_code=200)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -117,7 +158,8 @@ async def delete_file(request: DeleteFileRequest = Body(...)):
             request.workspace_id, 
             request.file_id
         )
-        return JSONResponse(content=result.model_dump(), status_code=200)
+        _invalidate_search(request.workspace_id)
+        return ORJSONResponse(content=result.model_dump(), status_code=200)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -133,7 +175,8 @@ async def delete_file_by_name(request: DeleteFileByNameRequest = Body(...)):
             request.workspace_id, 
             request.file_name
         )
-        return JSONResponse(content=result.model_dump(), status_code=200)
+        _invalidate_search(request.workspace_id)
+        return ORJSONResponse(content=result.model_dump(), status_code=200)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -1,14 +1,21 @@
+import asyncio
+import hashlib
 import os
 
-import aiofiles
 import httpx
-import tempfile
-from openai import AsyncOpenAI
+from io import BytesIO
+from typing import IO, Optional, Union
+from cachetools import TTLCache
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from dotenv import load_dotenv
+from functools import lru_cache
 from mimetypes import guess_extension
 from services.common.log_creator import create_logger
 
-from services.vector_store.openai.db import get_vector_store_id, set_vector_store_id
+from services.vector_store.openai.db import (
+    aget_vector_store_id, aset_vector_store_id, aget_sync_fingerprint, aset_sync_fingerprint
+)
+from services.vector_store.openai.semantic_cache import SemanticCache, SEMANTIC_CACHE_ENABLED
 from services.vector_store.openai.models import (
     SyncRequest, SyncFilesResponse, VectorStoreInfoResponse, 
     VectorStoreStatusResponse, SearchResponse, FileOperationResponse,
@@ -23,6 +30,19 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 CHANNEL_MANAGER_API_KEY = os.getenv("CHANNEL_MANAGER_API_KEY")
 IS_PRODUCTION = os.getenv("IS_PRODUCTION", "no")
 LOG_URL = os.getenv("LOG_URL", "vector_store_service.log")
+logger = create_logger(IS_PRODUCTION, LOG_URL)
+# Read size used when streaming media downloads
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Max files uploaded or deleted at once by a single sync_files call
+SYNC_MAX_CONCURRENCY = int(os.getenv("SYNC_MAX_CONCURRENCY", "16"))
+# Max concurrent files.retrieve calls when listing workspace files
+FILE_DETAILS_CONCURRENCY = int(os.getenv("FILE_DETAILS_CONCURRENCY", "10"))
+# Page size for vector store file listings (the API maximum)
+FILE_LIST_PAGE_SIZE = 100
+# Max documents accepted by one /sync-files request
+SYNC_MAX_BATCH = int(os.getenv("SYNC_MAX_BATCH", "100"))
+# Max characters accepted in a /search query
+SEARCH_MAX_QUERY_LENGTH = int(os.getenv("SEARCH_MAX_QUERY_LENGTH", "4096"))
 
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY must be set in environment variables.")
@@ -30,184 +50,309 @@ if not OPENAI_API_KEY:
 if not CHANNEL_MANAGER_API_KEY:
     raise ValueError("CHANNEL_MANAGER_API_KEY must be set in environment variables.")
 
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+
+@lru_cache(maxsize=256)
+def _ext_for(mime_type: str) -> str:
+    """File extension for a mime type (memoized; guess_extension scans its tables)."""
+    return guess_extension(mime_type.strip())
+
+
+# One client (and connection pool) shared by every request. HTTP/2 lets the
+# many small concurrent calls of a sync share a few multiplexed connections.
+client = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    http_client=DefaultAsyncHttpxClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=100, max_connections=1000, keepalive_expiry=60),
+        timeout=httpx.Timeout(60.0, connect=10.0)
+    )
+)
+
+# Shared client for media downloads, so repeated downloads from the media
+# server reuse warm keep-alive connections
+download_client = httpx.AsyncClient(
+    timeout=60*10,
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+)
 
 
 class VectorStoreService:
     def __init__(self):
         self.client = client
-        self.files_dir = "openai_vector_store/files"
-        self.logger = create_logger(IS_PRODUCTION, LOG_URL)
-
-    async def download_file(self, media_id: str, download_url_pattern: str, bearer_token: str, save_path: str):
-        """Download a file from the media download URL and save it locally."""
-        self.logger.info(f"Starting file download: media_id={media_id}, save_path={save_path}")
-        
+        self.download_client = download_client
+        # workspace_id -> in-flight vector store creation shared by concurrent callers
+        self._pending_creates: dict[str, asyncio.Future] = {}
+        # workspace_id -> {filename: file_id}, filled by get_workspace_files and
+        # dropped whenever this service inserts or deletes a file in the workspace
+        self._file_index: TTLCache = TTLCache(maxsize=1024, ttl=300)
+        # Reuses results of near-duplicate queries (opt-in, see semantic_cache.py)
+        self.semantic_cache = SemanticCache() if SEMANTIC_CACHE_ENABLED else None
+
+    async def close(self):
+        """Close the shared OpenAI and download HTTP connection pools."""
+        await self.client.close()
+        await self.download_client.aclose()
+
+    async def _download_to_memory(self, media_id: str, download_url_pattern: str, bearer_token: str) -> BytesIO:
+        """Download a file from the media download URL into an in-memory buffer."""
         download_url = download_url_pattern.replace("{media_id}", media_id)
         headers = {"Authorization": f"Bearer {bearer_token}"}
 
-        try:
-            async with httpx.AsyncClient() as client:
-                self.logger.debug(f"Making HTTP request to: {download_url}")
-                response = await client.get(download_url, headers=headers, timeout=60*10)
-                response.raise_for_status()
-
-                # Create directory if it doesn't exist
-                os.makedirs(os.path.dirname(save_path), exist_ok=True)
-
-                # Save file
-                async with aiofiles.open(save_path, "wb") as f:
-                    await f.write(response.content)
-                
-                self.logger.info(f"Successfully downloaded file: {save_path}")
-        except Exception as e:
-            self.logger.error(f"Failed to download file {media_id}: {str(e)}")
-            raise
+        logger.debug("Downloading file into memory: %s", download_url)
+        buffer = BytesIO()
+        async with self.download_client.stream("GET", download_url, headers=headers) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                buffer.write(chunk)
+        buffer.seek(0)
+        return buffer
 
     async def get_or_create_vector_store_id(self, workspace_id: str) -> str:
         """Get existing vector store ID or create a new one."""
-        self.logger.info(f"Getting or creating vector store for workspace: {workspace_id}")
+        logger.info(f"Getting or creating vector store for workspace: {workspace_id}")
         
-        # Try to get vector_store_id from DB
-        vector_store_id = get_vector_store_id(workspace_id)
+        # Try to get vector_store_id from DB (served from the in-process cache when warm)
+        vector_store_id = await aget_vector_store_id(workspace_id)
         if vector_store_id:
-            self.logger.info(f"Found existing vector store: {vector_store_id}")
+            logger.info(f"Found existing vector store: {vector_store_id}")
             return vector_store_id
         
-        # Create new vector store
-        self.logger.info(f"Creating new vector store for workspace: {workspace_id}")
+        # Concurrent callers for a new workspace share one creation instead of
+        # each creating (and mapping) their own vector store
+        pending = self._pending_creates.get(workspace_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._create_vector_store(workspace_id))
+            self._pending_creates[workspace_id] = pending
+            pending.add_done_callback(lambda _: self._pending_creates.pop(workspace_id, None))
+        return await asyncio.shield(pending)
+
+    async def _create_vector_store(self, workspace_id: str) -> str:
+        """Create a vector store for a workspace and store the mapping."""
+        logger.info(f"Creating new vector store for workspace: {workspace_id}")
         try:
             vs = await self.client.vector_stores.create(name=workspace_id)
-            set_vector_store_id(workspace_id, vs.id)
-            self.logger.info(f"Created new vector store: {vs.id}")
+            await aset_vector_store_id(workspace_id, vs.id)
+            logger.info(f"Created new vector store: {vs.id}")
             return vs.id
         except Exception as e:
-            self.logger.error(f"Failed to create vector store for workspace {workspace_id}: {str(e)}")
+            logger.error(f"Failed to create vector store for workspace {workspace_id}: {str(e)}")
             raise
 
     async def sync_files(self, request: SyncRequest) -> SyncFilesResponse:
         """Sync files to the OpenAI vector store for a workspace."""
         workspace_id = request.workspace_id
-        self.logger.info(f"Starting file sync for workspace: {workspace_id}, documents count: {len(request.documents)}")
+        logger.info(f"Starting file sync for workspace: {workspace_id}, documents count: {len(request.documents)}")
         
         if not workspace_id:
-            self.logger.error("Sync failed: workspace_id is required")
+            logger.error("Sync failed: workspace_id is required")
             raise ValueError("workspace_id required")
 
         # Get or create the vector store
         vector_store_id = await self.get_or_create_vector_store_id(workspace_id)
-        
+
         # Get current documents filenames
-        current_doc_filenames = set()
-        current_doc_mime_types = dict()
-        for doc in request.documents:
-            file_name = doc.id + guess_extension(doc.mimeType.strip())
-            current_doc_filenames.add(file_name)
-            current_doc_mime_types[file_name] = doc.mimeType
+        current_doc_media_ids = {doc.id + _ext_for(doc.mimeType): doc.id for doc in request.documents}
         
-        self.logger.info(f"Current document filenames: {current_doc_filenames}")
+        # The same document list as the last complete sync needs no listing or
+        # diff, as long as the store still holds exactly those files
+        fingerprint = self._sync_fingerprint(request)
+        if await self._sync_is_current(workspace_id, vector_store_id, fingerprint, len(current_doc_media_ids)):
+            logger.info(f"Document list unchanged for workspace {workspace_id}, skipping sync")
+            return SyncFilesResponse(
+                vector_store_id=vector_store_id,
+                deleted_docs=[],
+                inserted_docs=[]
+            )
+        current_doc_filenames = set(current_doc_media_ids)
+        
+        logger.info(f"Current document filenames: {current_doc_filenames}")
         
         # Get existing files in vector store using get_workspace_files
         existing_files = {}  # filename -> file_id mapping
         try:
-            workspace_files_response = await self.get_workspace_files(workspace_id)
+            workspace_files_response = await self.get_workspace_files(workspace_id, vector_store_id=vector_store_id)
             for file_info in workspace_files_response.files:
                 existing_files[file_info.filename] = file_info.file_id
         except Exception as e:
-            self.logger.error(f"Failed to get existing files: {str(e)}")
+            logger.error(f"Failed to get existing files: {str(e)}")
             existing_files = {}
         
-        self.logger.info(f"Existing files in vector store: {list(existing_files.keys())}")
+        logger.info(f"Existing files in vector store: {list(existing_files.keys())}")
         
         # Find files to add and remove
-        files_to_add = current_doc_filenames - set(existing_files.keys())
-        files_to_remove = set(existing_files.keys()) - current_doc_filenames
+        # dict key views are set-like, so no intermediate set is built
+        existing_filenames = existing_files.keys()
+        files_to_add = current_doc_filenames - existing_filenames
+        files_to_remove = existing_filenames - current_doc_filenames
         
-        self.logger.info(f"Files to add: {files_to_add}")
-        self.logger.info(f"Files to remove: {files_to_remove}")
+        logger.info(f"Files to add: {files_to_add}")
+        logger.info(f"Files to remove: {files_to_remove}")
         
-        # Remove files that are no longer in the document list
-        removed_file_ids = []
-        for filename in files_to_remove:
-            file_id = existing_files[filename]
-            await self.delete_file(workspace_id,file_id)
-            self.logger.info(f"Successfully removed file: {filename}")
-        for filename in files_to_add:
-            mime_type = current_doc_mime_types[filename]
-            await self.download_and_insert_file(workspace_id,filename.split(".")[0],request.media_download_url_pattern,CHANNEL_MANAGER_API_KEY,mime_type)
-            self.logger.info(f"Successfully inserted file: {filename}")
-
-        self.logger.info(f"File sync completed for workspace {workspace_id}: {len(files_to_add)} files uploaded, {len(files_to_remove)} files removed")
+        # Files are independent, so work on several at once (bounded so large
+        # syncs do not flood the OpenAI API or the media server)
+        semaphore = asyncio.Semaphore(SYNC_MAX_CONCURRENCY)
+
+        async def remove_file(filename: str):
+            async with semaphore:
+                await self.delete_file(workspace_id, existing_files[filename], vector_store_id=vector_store_id)
+            logger.info(f"Successfully removed file: {filename}")
+
+        async def upload_file(filename: str) -> str:
+            async with semaphore:
+                file_content = await self._download_to_memory(current_doc_media_ids[filename], request.media_download_url_pattern, CHANNEL_MANAGER_API_KEY)
+                return await self._upload_file(file_content, filename)
+
+        # Removals and uploads run together; one failed file does not stop the rest
+        removals = list(files_to_remove)
+        additions = list(files_to_add)
+        results = await asyncio.gather(
+            *[remove_file(filename) for filename in removals],
+            *[upload_file(filename) for filename in additions],
+            return_exceptions=True
+        )
+        removed = [filename for filename, result in zip(removals, results) if not isinstance(result, BaseException)]
+        uploaded = {filename: result for filename, result in zip(additions, results[len(removals):]) if not isinstance(result, BaseException)}
+        for filename, result in zip(removals + additions, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to sync file {filename}: {str(result)}")
+
+        # Attach every uploaded file with one batch instead of one call per file
+        failed_ids = await self._attach_file_batch(vector_store_id, list(uploaded.values()))
+        inserted = [filename for filename, file_id in uploaded.items() if file_id not in failed_ids]
+        if uploaded:
+            self._file_index.pop(workspace_id, None)
+
+        failed_count = len(results) - len(removed) - len(inserted)
+        # A partial sync must not let a later identical request skip the retry
+        await aset_sync_fingerprint(workspace_id, None if failed_count else fingerprint)
+        logger.info(f"File sync completed for workspace {workspace_id}: {len(inserted)} files uploaded, {len(removed)} files removed, {failed_count} failed")
         return SyncFilesResponse(
             vector_store_id=vector_store_id,
-            deleted_docs=files_to_remove,
-            inserted_docs=files_to_add
+            deleted_docs=removed,
+            inserted_docs=inserted
         )
 
+    @staticmethod
+    def _sync_fingerprint(request: SyncRequest) -> str:
+        """Hash of the document list that decides which files a sync keeps."""
+        digest = hashlib.blake2b(digest_size=16)
+        for doc_id, mime_type in sorted((doc.id, doc.mimeType) for doc in request.documents):
+            digest.update(f"{doc_id}\0{mime_type}\0".encode())
+        return digest.hexdigest()
+
+    async def _sync_is_current(self, workspace_id: str, vector_store_id: str, fingerprint: str, file_count: int) -> bool:
+        """Whether the last complete sync had this fingerprint and the store still matches it.
+
+        The fingerprint is kept in the database (cleared by every insert and
+        delete); the store's file_counts catch changes made outside this service.
+        """
+        try:
+            if await aget_sync_fingerprint(workspace_id) != fingerprint:
+                return False
+            vector_store = await self.client.vector_stores.retrieve(vector_store_id)
+        except Exception as e:
+            logger.warning(f"Could not check sync fingerprint for workspace {workspace_id}: {str(e)}")
+            return False
+        file_counts = vector_store.file_counts
+        return file_counts.total == file_counts.completed == file_count
+
+    async def _attach_file_batch(self, vector_store_id: str, file_ids: list[str]) -> set[str]:
+        """Attach uploaded files to a vector store as one batch.
+
+        Returns the IDs of files that could not be attached; those uploads
+        are deleted so they do not linger in OpenAI storage.
+        """
+        if not file_ids:
+            return set()
+
+        try:
+            logger.debug(f"Attaching {len(file_ids)} files to vector store: {vector_store_id}")
+            batch = await self.client.vector_stores.file_batches.create_and_poll(
+                vector_store_id=vector_store_id,
+                file_ids=file_ids
+            )
+            failed_ids = set()
+            if batch.file_counts.failed or batch.file_counts.cancelled:
+                async for file in self.client.vector_stores.file_batches.list_files(
+                    batch.id, vector_store_id=vector_store_id, limit=FILE_LIST_PAGE_SIZE
+                ):
+                    if file.status in ("failed", "cancelled"):
+                        failed_ids.add(file.id)
+        except Exception as e:
+            logger.error(f"Failed to attach file batch to vector store {vector_store_id}: {str(e)}")
+            failed_ids = set(file_ids)
+
+        if failed_ids:
+            logger.error(f"Files not attached to vector store {vector_store_id}: {sorted(failed_ids)}")
+            await asyncio.gather(*[self.client.files.delete(file_id) for file_id in failed_ids], return_exceptions=True)
+        return failed_ids
+
     async def get_vector_store_info(self, workspace_id: str) -> VectorStoreInfoResponse:
         """Get vector store information for a workspace."""
-        self.logger.info(f"Getting vector store info for workspace: {workspace_id}")
+        logger.info(f"Getting vector store info for workspace: {workspace_id}")
         
-        vector_store_id = get_vector_store_id(workspace_id)
+        vector_store_id = await aget_vector_store_id(workspace_id)
         if not vector_store_id:
-            self.logger.error(f"No vector store found for workspace: {workspace_id}")
+            logger.error(f"No vector store found for workspace: {workspace_id}")
             raise ValueError("No vector store for this workspace")
         
         try:
             vector_store = await self.client.vector_stores.retrieve(vector_store_id)
-            self.logger.debug(f"Retrieved vector store: {vector_store.id}")
+            logger.debug(f"Retrieved vector store: {vector_store.id}")
             
             # Get files from OpenAI directly
             files = []
-            async for file in self.client.vector_stores.files.list(vector_store_id=vector_store_id):
+            async for file in self.client.vector_stores.files.list(vector_store_id=vector_store_id, limit=FILE_LIST_PAGE_SIZE):
                 files.append(FileInfo(
                     file_id=file.id,
                     status=file.status,
                     created_at=file.created_at
                 ))
             
-            self.logger.info(f"Retrieved vector store info with {len(files)} files")
+            logger.info(f"Retrieved vector store info with {len(files)} files")
             return VectorStoreInfoResponse(
                 vector_store_id=vector_store.id,
                 files=files
             )
         except Exception as e:
-            self.logger.error(f"Failed to get vector store info for workspace {workspace_id}: {str(e)}")
+            logger.error(f"Failed to get vector store info for workspace {workspace_id}: {str(e)}")
             raise ValueError("Vector store not found")
 
-    async def get_vector_store_status(self, vector_store_id: str) -> VectorStoreStatusResponse:
-        """Get the status of a vector store and all its files."""
-        self.logger.info(f"Getting vector store status for: {vector_store_id}")
+    async def get_vector_store_status(self, vector_store_id: str, include_files: bool = False) -> VectorStoreStatusResponse:
+        """Get the status of a vector store, and optionally of all its files.
+
+        Status counts come from the vector store's own file_counts; the file
+        list is only paginated when include_files is set.
+        """
+        logger.info(f"Getting vector store status for: {vector_store_id}")
         
         try:
             # Get vector store info
             vector_store = await self.client.vector_stores.retrieve(vector_store_id)
-            self.logger.debug(f"Retrieved vector store info: {vector_store.name}")
+            logger.debug(f"Retrieved vector store info: {vector_store.name}")
 
-            # Get all files in the vector store and their statuses
-            file_statuses = []
+            file_counts = vector_store.file_counts
             status_counts = {
-                "in_progress": 0,
-                "completed": 0,
-                "failed": 0,
-                "cancelled": 0
+                "in_progress": file_counts.in_progress,
+                "completed": file_counts.completed,
+                "failed": file_counts.failed,
+                "cancelled": file_counts.cancelled
             }
-
-            async for file in self.client.vector_stores.files.list(vector_store_id=vector_store_id):
-                file_status = file.status
-                file_statuses.append(FileInfo(
-                    file_id=file.id,
-                    status=file_status,
-                    created_at=file.created_at,
-                    bytes=file.usage_bytes
-                ))
-
-                # Count statuses
-                if file_status in status_counts:
-                    status_counts[file_status] += 1
+            total_files = file_counts.total
+
+            file_statuses = None
+            if include_files:
+                file_statuses = [
+                    FileInfo(
+                        file_id=file.id,
+                        status=file.status,
+                        created_at=file.created_at,
+                        bytes=file.usage_bytes
+                    )
+                    async for file in self.client.vector_stores.files.list(vector_store_id=vector_store_id, limit=FILE_LIST_PAGE_SIZE)
+                ]
 
             # Determine overall status
-            total_files = len(file_statuses)
             if status_counts["failed"] > 0:
                 overall_status = "failed"
             elif status_counts["in_progress"] > 0:
@@ -219,7 +364,7 @@ class VectorStoreService:
             else:
                 overall_status = "partial"
 
-            self.logger.info(f"Vector store status: {overall_status}, total files: {total_files}")
+            logger.info(f"Vector store status: {overall_status}, total files: {total_files}")
             result = VectorStoreStatusResponse(
                 vector_store_id=vector_store_id,
                 workspace_id=vector_store.name,
@@ -228,150 +373,169 @@ class VectorStoreService:
                 status_breakdown=StatusBreakdown(**status_counts) if total_files > 0 else None,
                 files=file_statuses,
                 created_at=vector_store.created_at,
-                file_counts=vector_store.file_counts.to_dict()
+                file_counts=file_counts.to_dict()
             )
             return result
 
         except Exception as e:
-            self.logger.error(f"Failed to get vector store status for {vector_store_id}: {str(e)}")
+            logger.error(f"Failed to get vector store status for {vector_store_id}: {str(e)}")
             raise ValueError(f"Vector store not found: {str(e)}")
 
-    async def search_vector_store(self, workspace_id: str, query: str, max_num_results: int = 20) -> dict:
-        """Search a vector store for documents matching the query."""
-        self.logger.info(f"Starting vector store search: workspace_id={workspace_id}, query='{query}', max_results={max_num_results}")
+    async def search_vector_store(self, workspace_id: str, query: str, max_num_results: int = 20,
+                                  no_cache: bool = False) -> dict:
+        """Search a vector store for documents matching the query.
+
+        When the semantic cache is enabled, a recent result for a sufficiently
+        similar query is returned instead; pass no_cache=True to always search.
+        """
+        logger.info(f"Starting vector store search: workspace_id={workspace_id}, query='{query}', max_results={max_num_results}")
         
-        vector_store_id = get_vector_store_id(workspace_id)
+        vector_store_id = await aget_vector_store_id(workspace_id)
         if not vector_store_id:
-            self.logger.error(f"No vector store found for workspace: {workspace_id}")
+            logger.error(f"No vector store found for workspace: {workspace_id}")
             raise ValueError("No vector store for this workspace")
+
+        query_embedding = None
+        if self.semantic_cache is not None and not no_cache:
+            try:
+                query_embedding = await self.semantic_cache.embed(query)
+                cached = self.semantic_cache.lookup(workspace_id, query_embedding, max_num_results)
+                if cached is not None:
+                    logger.info(f"Semantic cache hit for workspace: {workspace_id}")
+                    return cached
+            except Exception as e:
+                # The cache is an optimization; fall back to a plain search
+                logger.warning(f"Semantic cache lookup failed for workspace {workspace_id}: {str(e)}")
+                query_embedding = None
         
         try:
             # Create a temporary assistant to use for search
-            self.logger.debug(f"Searching vector store: {vector_store_id}")
+            logger.debug(f"Searching vector store: {vector_store_id}")
             documents = await self.client.vector_stores.search(
                 vector_store_id=vector_store_id,
                 query=query,
                 max_num_results=max_num_results
             )
             
-            self.logger.info(f"Search completed successfully for workspace: {workspace_id}")
-            return documents.to_dict()
+            logger.info(f"Search completed successfully for workspace: {workspace_id}")
+            result = documents.to_dict()
             
         except Exception as e:
-            self.logger.error(f"Search failed for workspace {workspace_id}: {str(e)}")
+            logger.error(f"Search failed for workspace {workspace_id}: {str(e)}")
             raise ValueError(f"Search failed: {str(e)}")
 
-    async def insert_file(self, workspace_id: str, file_content: bytes, file_name: str) -> FileOperationResponse:
-        """Insert a single file into the vector store."""
-        self.logger.info(f"Starting file insertion: workspace_id={workspace_id}, file_name={file_name}")
+        if query_embedding is not None:
+            self.semantic_cache.store(workspace_id, query_embedding, max_num_results, result)
+        return result
+
+    def invalidate_search_cache(self, workspace_id: str):
+        """Drop semantically cached search results after a workspace's files change."""
+        if self.semantic_cache is not None:
+            self.semantic_cache.invalidate(workspace_id)
+
+    async def insert_file(self, workspace_id: str, file_content: Union[bytes, IO[bytes]], file_name: str,
+                          vector_store_id: Optional[str] = None) -> FileOperationResponse:
+        """Insert a single file into the vector store.
+
+        file_content may be bytes or a binary file object; file objects are
+        streamed to OpenAI without being read into memory first.
+        """
+        logger.info(f"Starting file insertion: workspace_id={workspace_id}, file_name={file_name}")
         
-        vector_store_id = await self.get_or_create_vector_store_id(workspace_id)
-        is_uploaded = False
+        vector_store_id = vector_store_id or await self.get_or_create_vector_store_id(workspace_id)
+        # The next sync must reconcile the store again (cleared first so it
+        # cannot be skipped even if this insert only partly succeeds)
+        await aset_sync_fingerprint(workspace_id, None)
+        file_id = None
         try:
-            # Upload file to OpenAI
-            self.logger.debug(f"Uploading file to OpenAI: {file_name}")
-            up = await self.client.files.create(
-                file=(file_name, file_content), 
-                purpose="assistants"
-            )
-            
-            # Attach file to vector store
-            self.logger.debug(f"Attaching file to vector store: {up.id}")
-            await self.client.vector_stores.files.create(
-                vector_store_id=vector_store_id,
-                file_id=up.id
-            )
-            is_uploaded = True
-            self.logger.info(f"Successfully inserted file: {file_name} (ID: {up.id})")
+            file_id = await self._upload_file(file_content, file_name)
+            await self._attach_file(vector_store_id, file_id)
+            self._file_index.pop(workspace_id, None)
+            logger.info(f"Successfully inserted file: {file_name} (ID: {file_id})")
             return FileOperationResponse(
                 vector_store_id=vector_store_id,
-                file_id=up.id,
+                file_id=file_id,
                 file_name=file_name,
                 status="uploaded"
             )
             
         except Exception as e:
-            self.logger.error(f"Failed to insert file {file_name}: {str(e)}")
-            if is_uploaded:
-                await self.delete_file(workspace_id, up.id)
-    async def download_and_insert_file(self, workspace_id: str, media_id: str, download_url_pattern: str, bearer_token: str, mime_type: str) -> FileOperationResponse:
-        """Download a file to temp folder, insert it to OpenAI, then clean up."""
-        self.logger.info(f"Starting download and insert: workspace_id={workspace_id}, media_id={media_id}")
-        
-        file_name = media_id + guess_extension(mime_type.strip())
-        temp_file_path = None
-        
-        try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=guess_extension(mime_type.strip())) as temp_file:
-                temp_file_path = temp_file.name
-                self.logger.debug(f"Created temporary file: {temp_file_path}")
-            
-            # Download file to temporary location
-            self.logger.debug(f"Downloading file to temp location: {temp_file_path}")
-            await self.download_file(media_id, download_url_pattern, bearer_token, temp_file_path)
-            
-            # Read file content
-            #TODO: in memory file reading
-            async with aiofiles.open(temp_file_path, "rb") as af:
-                file_content = await af.read()
-            
-            # Insert file to OpenAI
-            self.logger.debug(f"Inserting file to OpenAI: {file_name}")
-            result = await self.insert_file(workspace_id, file_content, file_name)
-            
-            self.logger.info(f"Successfully downloaded and inserted file: {file_name}")
-            return result
-            
-        except Exception as e:
-            self.logger.error(f"Failed to download and insert file {media_id}: {str(e)}")
-            raise ValueError(f"Failed to download and insert file: {str(e)}")
-        
-        finally:
-            # Clean up temporary file
-            if temp_file_path and os.path.exists(temp_file_path):
+            logger.error(f"Failed to insert file {file_name}: {str(e)}")
+            if file_id:
+                # Do not leave an unattached upload behind in OpenAI storage
                 try:
-                    os.unlink(temp_file_path)
-                    self.logger.debug(f"Cleaned up temporary file: {temp_file_path}")
-                except Exception as e:
-                    self.logger.warning(f"Failed to clean up temporary file {temp_file_path}: {str(e)}")
+                    await self.client.files.delete(file_id)
+                except Exception as cleanup_error:
+                    logger.error(f"Failed to delete unattached upload {file_id}: {str(cleanup_error)}")
+            raise ValueError(f"Failed to insert file: {str(e)}")
+
+    async def _upload_file(self, file_content: Union[bytes, IO[bytes]], file_name: str) -> str:
+        """Upload a file to OpenAI storage and return its file id."""
+        logger.debug("Uploading file to OpenAI: %s", file_name)
+        up = await self.client.files.create(
+            file=(file_name, file_content), 
+            purpose="assistants"
+        )
+        return up.id
+
+    async def _attach_file(self, vector_store_id: str, file_id: str):
+        """Attach an uploaded file to a vector store."""
+        logger.debug("Attaching file to vector store: %s", file_id)
+        await self.client.vector_stores.files.create(
+            vector_store_id=vector_store_id,
+            file_id=file_id
+        )
 
-    async def get_vector_store_status_by_workspace(self, workspace_id: str) -> VectorStoreStatusResponse:
+    async def get_vector_store_status_by_workspace(self, workspace_id: str, include_files: bool = False) -> VectorStoreStatusResponse:
         """Get the status of a vector store by workspace ID."""
-        self.logger.info(f"Getting vector store status for workspace: {workspace_id}")
+        logger.info(f"Getting vector store status for workspace: {workspace_id}")
         
-        vector_store_id = get_vector_store_id(workspace_id)
+        vector_store_id = await aget_vector_store_id(workspace_id)
         if not vector_store_id:
-            self.logger.error(f"No vector store found for workspace: {workspace_id}")
+            logger.error(f"No vector store found for workspace: {workspace_id}")
             raise ValueError("No vector store for this workspace")
         
-        return await self.get_vector_store_status(vector_store_id)
+        return await self.get_vector_store_status(vector_store_id, include_files)
 
-    async def get_workspace_files(self, workspace_id: str) -> WorkspaceFilesResponse:
+    async def get_workspace_files(self, workspace_id: str, vector_store_id: Optional[str] = None) -> WorkspaceFilesResponse:
         """Get all files in a workspace with detailed information."""
-        self.logger.info(f"Getting workspace files for: {workspace_id}")
+        logger.info(f"Getting workspace files for: {workspace_id}")
         
-        vector_store_id = get_vector_store_id(workspace_id)
+        vector_store_id = vector_store_id or await aget_vector_store_id(workspace_id)
         if not vector_store_id:
-            self.logger.error(f"No vector store found for workspace: {workspace_id}")
+            logger.error(f"No vector store found for workspace: {workspace_id}")
             raise ValueError("No vector store for this workspace")
         
         try:
-            files = []
-            self.logger.debug(f"Fetching files from vector store: {vector_store_id}")
-            async for file in self.client.vector_stores.files.list(vector_store_id=vector_store_id):
-                # Get detailed file information
-                file_details = await self.client.files.retrieve(file.id)
-                files.append(FileInfo(
+            logger.debug(f"Fetching files from vector store: {vector_store_id}")
+            vs_files = [
+                file async for file in self.client.vector_stores.files.list(
+                    vector_store_id=vector_store_id, limit=FILE_LIST_PAGE_SIZE
+                )
+            ]
+            
+            # Get detailed file information for all files at once (bounded)
+            semaphore = asyncio.Semaphore(FILE_DETAILS_CONCURRENCY)
+            
+            async def retrieve(file_id: str):
+                async with semaphore:
+                    return await self.client.files.retrieve(file_id)
+            
+            details = await asyncio.gather(*[retrieve(file.id) for file in vs_files])
+            files = [
+                FileInfo(
                     file_id=file.id,
                     filename=file_details.filename,
                     status=file.status,
                     created_at=file.created_at,
                     bytes=file_details.bytes,
                     purpose=file_details.purpose
-                ))
+                )
+                for file, file_details in zip(vs_files, details)
+            ]
+            self._file_index[workspace_id] = {file.filename: file.file_id for file in files}
             
-            self.logger.info(f"Retrieved {len(files)} files for workspace: {workspace_id}")
+            logger.info(f"Retrieved {len(files)} files for workspace: {workspace_id}")
             return WorkspaceFilesResponse(
                 workspace_id=workspace_id,
                 vector_store_id=vector_store_id,
@@ -379,70 +543,97 @@ class VectorStoreService:
                 files=files
             )
         except Exception as e:
-            self.logger.error(f"Failed to get workspace files for {workspace_id}: {str(e)}")
+            logger.error(f"Failed to get workspace files for {workspace_id}: {str(e)}")
             raise ValueError(f"Failed to get workspace files: {str(e)}")
 
-    async def delete_file(self, workspace_id: str, file_id: str) -> FileOperationResponse:
+    async def delete_file(self, workspace_id: str, file_id: str, vector_store_id: Optional[str] = None) -> FileOperationResponse:
         """Delete a file from the vector store."""
-        self.logger.info(f"Starting file deletion: workspace_id={workspace_id}, file_id={file_id}")
+        logger.info(f"Starting file deletion: workspace_id={workspace_id}, file_id={file_id}")
         
-        vector_store_id = get_vector_store_id(workspace_id)
+        vector_store_id = vector_store_id or await aget_vector_store_id(workspace_id)
         if not vector_store_id:
-            self.logger.error(f"No vector store found for workspace: {workspace_id}")
+            logger.error(f"No vector store found for workspace: {workspace_id}")
             raise ValueError("No vector store for this workspace")
         
         try:
-            # Step 1: Remove file from vector store (detaches from vector store)
-            self.logger.debug(f"Removing file from vector store: {file_id}")
-            await self.client.vector_stores.files.delete(
-                vector_store_id=vector_store_id,
-                file_id=file_id
-            )
+            # The next sync must reconcile the store again
+            await aset_sync_fingerprint(workspace_id, None)
             
-            # Step 2: Delete the actual file from OpenAI storage (permanent deletion)
-            self.logger.debug(f"Deleting file from OpenAI storage: {file_id}")
-            await self.client.files.delete(file_id)
+            # Detach the file from the vector store and delete it from OpenAI
+            # storage (permanent deletion); neither call needs the other's result
+            logger.debug("Removing file from vector store and OpenAI storage: %s", file_id)
+            results = await asyncio.gather(
+                self.client.vector_stores.files.delete(
+                    vector_store_id=vector_store_id,
+                    file_id=file_id
+                ),
+                self.client.files.delete(file_id),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
             
-            self.logger.info(f"Successfully deleted file: {file_id}")
+            self._file_index.pop(workspace_id, None)
+            logger.info(f"Successfully deleted file: {file_id}")
             return FileOperationResponse(
                 vector_store_id=vector_store_id,
                 file_id=file_id,
                 status="deleted"
             )
         except Exception as e:
-            self.logger.error(f"Failed to delete file {file_id}: {str(e)}")
+            logger.error(f"Failed to delete file {file_id}: {str(e)}")
             raise ValueError(f"Failed to delete file: {str(e)}")
 
-    async def delete_file_by_name(self, workspace_id: str, file_name: str) -> FileOperationResponse:
+    async def delete_file_by_name(self, workspace_id: str, file_name: str, vector_store_id: Optional[str] = None) -> FileOperationResponse:
         """Delete a file from the vector store by file name."""
-        self.logger.info(f"Starting file deletion by name: workspace_id={workspace_id}, file_name={file_name}")
+        logger.info(f"Starting file deletion by name: workspace_id={workspace_id}, file_name={file_name}")
         
-        vector_store_id = get_vector_store_id(workspace_id)
+        vector_store_id = vector_store_id or await aget_vector_store_id(workspace_id)
         if not vector_store_id:
-            self.logger.error(f"No vector store found for workspace: {workspace_id}")
+            logger.error(f"No vector store found for workspace: {workspace_id}")
             raise ValueError("No vector store for this workspace")
         
         try:
-            # Find the file by name using get_workspace_files
-            self.logger.debug(f"Searching for file by name: {file_name}")
-            workspace_files_response = await self.get_workspace_files(workspace_id)
-            
-            file_id = None
-            for file_info in workspace_files_response.files:
-                if file_info.filename == file_name:
-                    file_id = file_info.file_id
-                    self.logger.debug(f"Found file {file_name} with ID: {file_id}")
-                    break
+            # Use the workspace's filename index when it is warm; otherwise
+            # get_workspace_files lists the store and rebuilds it
+            file_index = self._file_index.get(workspace_id)
+            from_cache = file_index is not None and file_name in file_index
+            if not from_cache:
+                file_index = await self._refresh_file_index(workspace_id, vector_store_id, file_name)
             
+            file_id = file_index.get(file_name)
             if not file_id:
-                self.logger.error(f"File '{file_name}' not found in vector store")
+                logger.error(f"File '{file_name}' not found in vector store")
                 raise ValueError(f"File '{file_name}' not found in vector store")
+            logger.debug(f"Found file {file_name} with ID: {file_id}")
             
-            return await self.delete_file(workspace_id, file_id)
+            try:
+                return await self.delete_file(workspace_id, file_id, vector_store_id=vector_store_id)
+            except ValueError:
+                if not from_cache:
+                    raise
+                # The cached id may be stale (the file was deleted or re-uploaded
+                # elsewhere); look the name up again and retry once
+                logger.info(f"Delete of cached file id {file_id} failed, re-listing workspace {workspace_id}")
+                self._file_index.pop(workspace_id, None)
+                file_index = await self._refresh_file_index(workspace_id, vector_store_id, file_name)
+                fresh_file_id = file_index.get(file_name)
+                if not fresh_file_id:
+                    raise ValueError(f"File '{file_name}' not found in vector store")
+                if fresh_file_id == file_id:
+                    raise
+                return await self.delete_file(workspace_id, fresh_file_id, vector_store_id=vector_store_id)
         except Exception as e:
-            self.logger.error(f"Failed to delete file '{file_name}': {str(e)}")
+            logger.error(f"Failed to delete file '{file_name}': {str(e)}")
             raise ValueError(f"Failed to delete file '{file_name}': {str(e)}")
 
+    async def _refresh_file_index(self, workspace_id: str, vector_store_id: str, file_name: str) -> dict:
+        """List the workspace's files again and return its rebuilt filename index."""
+        logger.debug(f"Searching for file by name: {file_name}")
+        await self.get_workspace_files(workspace_id, vector_store_id=vector_store_id)
+        return self._file_index.get(workspace_id, {})
+
 
 # Create service instance
 vector_store_service = VectorStoreService() 
\ No newline at end of file
@@ -1,33 +1,44 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional, Dict, Any
 
 
 class WorkflowExecuteRequest(BaseModel):
     """Request model for executing a workflow"""
-    # This will accept any fields in the body since n8n workflows can have various inputs
-    data: Dict[str, Any]
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+    # This will accept any fields in the body since n8n workflows can have various inputs;
+    # a plain dict skips per-entry validation of the payload
+    data: dict
 
 
 
 class WorkflowTemplatesResponse(BaseModel):
     """Response model for listing workflow templates"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     templates: List[str]
     message: Optional[str] = None
 
 
 class WorkflowExecuteResponse(BaseModel):
     """Response model for workflow execution"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     message: Optional[str] = None
 
 
 class N8nWorkflowCloneRequest(BaseModel):
     """Internal model for cloning workflow requests to n8n API"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     name: str
     tags: Optional[List[str]] = None
 
 
 class N8nWorkflowUpdateRequest(BaseModel):
     """Internal model for updating workflow trigger URL"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     nodes: List[Dict[str, Any]]
     connections: Dict[str, Any]
     settings: Optional[Dict[str, Any]] = None
\ No newline at end of file
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, Body
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from services.common.decorators import response_formatter
 from services.workflow.n8n.n8n_service import n8n_service
 from services.workflow.n8n.models import (
@@ -12,7 +12,8 @@ from typing import Dict, Any
 # Create FastAPI router
 n8n_router = APIRouter(
     prefix="/workflow",
-    tags=["n8n_workflow"]
+    tags=["n8n_workflow"],
+    default_response_class=ORJSONResponse
 )
 
 
@@ -37,12 +38,8 @@ async def execute_workflow(
     Returns:
         WorkflowExecuteResponse with execution status and results
     """
-    try:
-        result = await n8n_service.execute_workflow(workspace, segment, request_data)
-        return JSONResponse(content=result.model_dump())
-    except Exception as e:
-        status_code = getattr(e, 'status_code', 400)
-        raise HTTPException(status_code=status_code, detail=str(e))
+    result = await n8n_service.execute_workflow(workspace, segment, request_data)
+    return ORJSONResponse(content=result.model_dump())
 
 
 @n8n_router.post("/message", response_model=WorkflowExecuteResponse)
@@ -64,29 +61,23 @@ async def execute_workflow(
     Returns:
         WorkflowExecuteResponse with execution status and results.
     """
-    try:
-        workspace = request_data.get("project_id") or request_data.get("workspace")
-        segment = request_data.get("project_name") or request_data.get("segment")
-        if not workspace or not segment:
-            raise HTTPException(
-                status_code=400,
-                detail="Both workspace (or project_id) and segment (or project_name) must be provided in request_data."
-            )
-        result = await n8n_service.execute_workflow(workspace, segment, request_data)
-        return JSONResponse(content=result.model_dump())
-    except Exception as e:
-        status_code = getattr(e, 'status_code', 400)
-        raise HTTPException(status_code=status_code, detail=str(e))       
+    workspace = request_data.get("project_id") or request_data.get("workspace")
+    segment = request_data.get("project_name") or request_data.get("segment")
+    if not workspace or not segment:
+        raise HTTPException(
+            status_code=400,
+            detail="Both workspace (or project_id) and segment (or project_name) must be provided in request_data."
+        )
+    result = await n8n_service.execute_workflow(workspace, segment, request_data)
+    return ORJSONResponse(content=result.model_dump())
+
+
 @n8n_router.get("/health")
 async def health_check():
     """Health check endpoint for n8n workflow service"""
-    try:
-        return {
-            "status": "healthy", 
-            "service": "n8n Workflow Service",
-            "base_url": n8n_service.n8n_base_url,
-            "env_prefix": n8n_service.env_prefix
-        }
-    except Exception as e:
-        status_code = getattr(e, 'status_code', 500)
-        raise HTTPException(status_code=status_code, detail=str(e))
\ No newline at end of file
+    return {
+        "status": "healthy", 
+        "service": "n8n Workflow Service",
+        "base_url": n8n_service.n8n_base_url,
+        "env_prefix": n8n_service.env_prefix
+    }
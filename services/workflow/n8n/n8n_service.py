@@ -1,45 +1,131 @@
+import asyncio
 import os
 import httpx
-from typing import List, Dict, Any, Optional
+import orjson
+from typing import List, Dict, Any, Optional, Tuple, FrozenSet
+from cachetools import TTLCache
 from dotenv import load_dotenv
 from services.common.log_creator import create_logger
+from services.common.exceptions import ServiceInputError
 from services.workflow.n8n.models import ( 
     WorkflowTemplatesResponse,
     WorkflowExecuteResponse,
 )
 
-# Load environment variables
-load_dotenv(override=True)
+# Load environment variables once at import; variables already set in the
+# environment take precedence over .env
+load_dotenv(override=False)
+
+# N8N Configuration
+N8N_BASE_URL = os.getenv("N8N_BASE_URL", "http://localhost:5678")
+N8N_API_KEY = os.getenv("N8N_API_KEY", "")
+N8N_ENV_PREFIX = os.getenv("N8N_ENV_PREFIX", "v1")
+
+# Logging Configuration
+IS_PRODUCTION = os.getenv("IS_PRODUCTION", "no")
+LOG_URL = os.getenv("LOG_URL", ".")
+logger = create_logger(IS_PRODUCTION, LOG_URL)
+
+# Connection pool for n8n; sized for bursts of workflow creation. The client
+# negotiates HTTP/2 so concurrent calls share connections, falling back to
+# HTTP/1.1 for n8n deployments without it
+N8N_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("N8N_HTTP_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=40,
+    keepalive_expiry=30
+)
+# Fail fast when n8n is unreachable; workflow runs may still take a while
+N8N_TIMEOUT = httpx.Timeout(connect=3.0, read=30.0, write=10.0, pool=5.0)
+# Quick control-plane calls (list templates, activate)
+N8N_CONTROL_TIMEOUT = httpx.Timeout(connect=3.0, read=10.0, write=10.0, pool=5.0)
+# How long (seconds) the template workflow index is reused
+N8N_TEMPLATE_CACHE_TTL = 60
+# Max workflows being created from templates at once
+N8N_MAX_CONCURRENT_CREATES = 8
+# How long (seconds) a newly created workflow is remembered, so callers that
+# still get 404 while n8n registers its webhook do not clone it again
+N8N_CREATED_WORKFLOW_TTL = 60
+# Attempts to run a freshly created workflow while n8n registers its
+# webhook; waits backoff_base * 3**attempt seconds between attempts
+N8N_EXECUTE_MAX_ATTEMPTS = int(os.getenv("N8N_EXECUTE_MAX_ATTEMPTS", "3"))
+N8N_EXECUTE_BACKOFF_BASE = float(os.getenv("N8N_EXECUTE_BACKOFF_BASE", "0.1"))
+
+# (workflow, tag names) for every workflow tagged 'template'
+TemplateIndex = List[Tuple[Dict[str, Any], FrozenSet[str]]]
 
 
 class N8nService:
     """Service for managing n8n workflow operations"""
     
     def __init__(self):
-        # N8N Configuration
-        self.n8n_base_url = os.getenv("N8N_BASE_URL", "http://localhost:5678")
-        self.n8n_api_key = os.getenv("N8N_API_KEY", "")
-        self.env_prefix = os.getenv("N8N_ENV_PREFIX", "v1")
-        
-        # Logging Configuration
-        is_production = os.getenv("IS_PRODUCTION", "no")
-        log_url = os.getenv("LOG_URL", ".")
-        self.logger = create_logger(is_production, log_url)
+        self.n8n_base_url = N8N_BASE_URL
+        self.n8n_api_key = N8N_API_KEY
+        self.env_prefix = N8N_ENV_PREFIX
+        self.logger = logger
         
         if not self.n8n_api_key:
             self.logger.warning("N8N_API_KEY not set - some operations may fail")
-    
-    def _get_headers(self) -> Dict[str, str]:
-        """Get HTTP headers for n8n API requests"""
-        headers = {
+
+        # HTTP headers for n8n API requests, built once
+        self._headers = {
             "Content-Type": "application/json",
             "Accept": "application/json"
         }
-        
         if self.n8n_api_key:
-            headers["X-N8N-API-KEY"] = self.n8n_api_key
-            
-        return headers
+            self._headers["X-N8N-API-KEY"] = self.n8n_api_key
+
+        # One keep-alive connection pool to n8n shared by every call, created
+        # on first use so it binds to the running event loop
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_lock = asyncio.Lock()
+
+        # Template workflows with their tag names, so missing workflows and
+        # template listings do not fetch and re-parse every template each time;
+        # concurrent misses share one fetch
+        self._template_cache: TTLCache = TTLCache(maxsize=1, ttl=N8N_TEMPLATE_CACHE_TTL)
+        self._pending_templates: Optional[asyncio.Future] = None
+
+        # (workspace, segment) -> in-flight workflow creation, so concurrent
+        # first messages to a new workflow do not each clone the template
+        self._pending_creates: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._created_workflows: TTLCache = TTLCache(maxsize=1024, ttl=N8N_CREATED_WORKFLOW_TTL)
+        self._create_semaphore = asyncio.Semaphore(N8N_MAX_CONCURRENT_CREATES)
+
+    async def __aenter__(self) -> "N8nService":
+        await self._get_client()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared n8n HTTP client, creating it on first use."""
+        if self._client is None:
+            async with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.AsyncClient(
+                        base_url=self.n8n_base_url,
+                        http2=True,
+                        headers=self._get_headers(),
+                        timeout=N8N_TIMEOUT,
+                        limits=N8N_LIMITS
+                    )
+        return self._client
+
+    async def aclose(self):
+        """Close the shared n8n HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    def _get_headers(self) -> Dict[str, str]:
+        """Get HTTP headers for n8n API requests"""
+        return self._headers
+    
+    @staticmethod
+    def _json(response: httpx.Response) -> Any:
+        """Decode a JSON response body with orjson"""
+        return orjson.loads(response.content)
     
     def _get_workflow_trigger_url(self, workspace: str, segment: str) -> str:
         """Generate the workflow trigger URL"""
@@ -54,249 +140,290 @@ class N8nService:
         
         # First, try to execute the existing workflow
         trigger_url = self._get_workflow_trigger_url(workspace, segment)
-        workflow_url = f"{self.n8n_base_url}/webhook{trigger_url}"
+        workflow_url = f"/webhook{trigger_url}"
+        
+        client = await self._get_client()
+        response = await client.post(
+            workflow_url,
+            content=orjson.dumps(data)
+        )
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                workflow_url,
-                json=data,
-                headers=self._get_headers(),
-                timeout=30.0
+        if response.status_code == 200:
+            self.logger.info(f"Workflow executed successfully for {workspace}/{segment}")
+            return WorkflowExecuteResponse(
+                message="Workflow executed successfully",
             )
-            
+        elif response.status_code == 404:
+            self.logger.info(f"Workflow not found for {workspace}/{segment}, attempting to create from template")
+            # Workflow doesn't exist, try to create it from template
+            return await self._create_workflow_from_template(workspace, segment, data)
+        else:
+            raise ValueError(
+                f"Workflow execution failed with status {response.status_code}: {response.text}")
+                
+    
+    async def _create_workflow_from_template(self, workspace: str, segment: str, data: Dict[str, Any]) -> WorkflowExecuteResponse:
+        """Create a new workflow from template and execute it"""
+        key = (workspace, segment)
+        # A workflow created moments ago may still 404 until its webhook is
+        # registered; go straight to the retries instead of cloning it again
+        if key not in self._created_workflows:
+            pending = self._pending_creates.get(key)
+            if pending is None:
+                pending = asyncio.ensure_future(self._create_workflow(workspace, segment))
+                self._pending_creates[key] = pending
+                pending.add_done_callback(lambda future: self._finish_create(key, future))
+
+            # Shield so one cancelled caller does not cancel the creation for the others
+            await asyncio.shield(pending)
+        
+        # Now try to execute the workflow; retry only while its webhook is not
+        # registered yet, without going back through the creation path
+        self.logger.info(f"Workflow '{workspace}_{segment}' is being registered, attempting execution")
+        workflow_url = f"/webhook{self._get_workflow_trigger_url(workspace, segment)}"
+        client = await self._get_client()
+        body = orjson.dumps(data)
+        for attempt in range(N8N_EXECUTE_MAX_ATTEMPTS):
+            response = await client.post(workflow_url, content=body)
             if response.status_code == 200:
                 self.logger.info(f"Workflow executed successfully for {workspace}/{segment}")
                 return WorkflowExecuteResponse(
                     message="Workflow executed successfully",
                 )
-            elif response.status_code == 404:
-                self.logger.info(f"Workflow not found for {workspace}/{segment}, attempting to create from template")
-                # Workflow doesn't exist, try to create it from template
-                return await self._create_workflow_from_template(workspace, segment, data)
-            else:
-                raise Exception(
+            if response.status_code != 404:
+                raise ValueError(
                     f"Workflow execution failed with status {response.status_code}: {response.text}")
-                    
-    
-    async def _create_workflow_from_template(self, workspace: str, segment: str, data: Dict[str, Any]) -> WorkflowExecuteResponse:
-        """Create a new workflow from template and execute it"""
-            # Find template workflow by tags
-        template_workflow = await self._find_template_workflow(segment)
-        if not template_workflow:
-            raise Exception(
-                f"No template workflow found for segment '{segment}'"
-                 )
-        # Clone the template workflow
-        new_workflow_name = f"{workspace}_{segment}"
-        cloned_workflow = await self._clone_workflow(template_workflow['id'], new_workflow_name, workspace, segment)
-        
-        if not cloned_workflow:
-            raise Exception(
-                f"Failed to clone template workflow for workspace '{workspace}' and segment '{segment}'"
-                )
+            if attempt < N8N_EXECUTE_MAX_ATTEMPTS - 1:
+                await asyncio.sleep(N8N_EXECUTE_BACKOFF_BASE * 3 ** attempt)
         
-        
-        # Activate the workflow
-        await self._activate_workflow_api(cloned_workflow['id'])
-        
-        # Now try to execute the workflow
-        self.logger.info(f"Created workflow '{new_workflow_name}', attempting execution")
-        return await self.execute_workflow(workspace, segment, data)
+        raise ValueError(
+            f"Workflow '{workspace}_{segment}' still not found after {N8N_EXECUTE_MAX_ATTEMPTS} attempts")
+
+    def _finish_create(self, key: Tuple[str, str], future: asyncio.Future):
+        self._pending_creates.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self._created_workflows[key] = True
+
+    async def _create_workflow(self, workspace: str, segment: str):
+        """Clone the segment's template workflow for a workspace and activate it"""
+        async with self._create_semaphore:
+            # Find template workflow by tags
+            template_workflow = await self._find_template_workflow(segment)
+            if not template_workflow:
+                raise ServiceInputError(
+                    f"No template workflow found for segment '{segment}'"
+                     )
+            # Clone the template workflow
+            new_workflow_name = f"{workspace}_{segment}"
+            cloned_workflow = await self._clone_workflow(template_workflow['id'], new_workflow_name, workspace, segment)
+            
+            if not cloned_workflow:
+                # The cached template may have been removed or changed in n8n
+                self._template_cache.clear()
+                raise ValueError(
+                    f"Failed to clone template workflow for workspace '{workspace}' and segment '{segment}'"
+                    )
+            
+            # Activate the workflow; an inactive clone would only 404, so remove
+            # it and fail instead of letting callers retry against it
+            if not await self._activate_workflow_api(cloned_workflow['id']):
+                await self._delete_workflow_api(cloned_workflow['id'])
+                raise ValueError(
+                    f"Failed to activate workflow '{new_workflow_name}'"
+                    )
         
     
     async def _find_template_workflow(self, segment: str) -> Optional[Dict[str, Any]]:
-        """Find a template workflow that matches the workspace and segment tags"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.n8n_base_url}/api/v1/workflows?tags=template",
-                headers=self._get_headers(),
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                self.logger.error(f"Failed to fetch workflows: {response.status_code}")
-                return None
-            
-            workflows = response.json().get('data', [])
-            
-            # Find workflows with 'template' tag and matching workspace/segment
-            for workflow in workflows:
-                tags = workflow.get('tags', [])
-                if isinstance(tags, list):
-                    tag_names = [tag.get('name', '') if isinstance(tag, dict) else str(tag) for tag in tags]
-                else:
-                    tag_names = []
-                defualt_template = None
-                # Check if this workflow has template tag and matches workspace and segment
-                if ('template' in tag_names and
-                    ('faq' in tag_names or 'FAQ' in tag_names)
-                    ):
-                    
-                    self.logger.info(f"Found template workflow: {workflow.get('name')} with tags: {tag_names}")
-                    defualt_template = workflow
-                
-                # Check if this workflow has template tag and matches workspace and segment
-                if ('template' in tag_names and
-                    segment in tag_names):
-                    
-                    self.logger.info(f"Found template workflow: {workflow.get('name')} with tags: {tag_names}")
-                    return workflow
+        """Find a template workflow that matches the segment tag, falling back to the FAQ template"""
+        # A failed template fetch is an n8n fault, not a missing template, so it propagates
+        templates = await self._get_template_index()
+
+        workflow = next((workflow for workflow, tags in templates if segment in tags), None)
+        if workflow is not None:
+            self.logger.info(f"Found template workflow: {workflow.get('name')} for segment: {segment}")
+            return workflow
+
+        self.logger.warning(f"No template workflow found with tags: template, {segment}")
+        return next((workflow for workflow, tags in templates if 'faq' in tags or 'FAQ' in tags), None)
+
+    async def _get_template_index(self) -> TemplateIndex:
+        """Return the template workflow index, reusing a recent fetch"""
+        templates = self._template_cache.get("templates")
+        if templates is not None:
+            return templates
+
+        if self._pending_templates is None:
+            self._pending_templates = asyncio.ensure_future(self._fetch_template_index())
+            self._pending_templates.add_done_callback(self._finish_template_fetch)
+
+        # Shield so one cancelled caller does not cancel the fetch for the others
+        return await asyncio.shield(self._pending_templates)
+
+    def _finish_template_fetch(self, future: asyncio.Future):
+        self._pending_templates = None
+        if not future.cancelled() and future.exception() is None:
+            self._template_cache["templates"] = future.result()
+
+    async def _fetch_template_index(self) -> TemplateIndex:
+        """Fetch workflows tagged 'template' and their tag names"""
+        client = await self._get_client()
+        response = await client.get("/api/v1/workflows?tags=template", timeout=N8N_CONTROL_TIMEOUT)
+        
+        if response.status_code != 200:
+            raise ValueError(f"Failed to fetch workflows: {response.status_code}")
+        
+        templates = []
+        for workflow in self._json(response).get('data', []):
+            tag_names = self._extract_tag_names(workflow)
+            if 'template' in tag_names:
+                templates.append((workflow, tag_names))
+        return templates
+
+    @staticmethod
+    def _extract_tag_names(workflow: Dict[str, Any]) -> FrozenSet[str]:
+        """Get a workflow's tag names (tags may be objects or plain strings)"""
+        tags = workflow.get('tags')
+        if not isinstance(tags, list):
+            return frozenset()
+        return frozenset(tag.get('name', '') if isinstance(tag, dict) else str(tag) for tag in tags)
             
-            self.logger.warning(f"No template workflow found with tags: template, {segment}")
-            if not defualt_template:
-                return None
-            return defualt_template
-                
     
     async def _clone_workflow(self, workflow_id: str, new_name: str, workspace: str, segment: str) -> Optional[Dict[str, Any]]:
         """Clone a workflow with a new name"""
             # First get the source workflow
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.n8n_base_url}/api/v1/workflows/{workflow_id}",
-                headers=self._get_headers(),
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                self.logger.error(f"Failed to fetch source workflow: {response.status_code}")
-                return None
-            
-            source_workflow = response.json()
-            del source_workflow['id']
-            # Create new workflow with cloned data
-            clone_data = {
-                "name": new_name,
-                "nodes": source_workflow.get('nodes', []),
-                "connections": source_workflow.get('connections', {}),
-                "settings": source_workflow.get('settings', {})
-            }
+        client = await self._get_client()
+        response = await client.get(f"/api/v1/workflows/{workflow_id}")
+        
+        if response.status_code != 200:
+            self.logger.error(f"Failed to fetch source workflow: {response.status_code}")
+            return None
+        
+        source_workflow = self._json(response)
+        del source_workflow['id']
+        # Create new workflow with cloned data
+        clone_data = {
+            "name": new_name,
+            "nodes": source_workflow.get('nodes', []),
+            "connections": source_workflow.get('connections', {}),
+            "settings": source_workflow.get('settings', {})
+        }
 
-            # Find the node
-            llm_trigger_node = [data for data in clone_data["nodes"] if data['name'] == 'llm trigger'][0]
-            # Set the 'path' parameter to a new value
-            llm_trigger_node["parameters"]["path"] = f"{self.env_prefix}/{workspace}/{segment}"
-            del clone_data["settings"]['callerPolicy']
-            
-            # Create the new workflow
-            create_response = await client.post(
-                f"{self.n8n_base_url}/api/v1/workflows",
-                json=clone_data,
-                headers=self._get_headers(),
-                timeout=30.0
-            )
+        # Find the node (stop at the first match)
+        llm_trigger_node = next((node for node in clone_data["nodes"] if node.get('name') == 'llm trigger'), None)
+        if llm_trigger_node is None:
+            self.logger.error(f"Template workflow {workflow_id} has no 'llm trigger' node")
+            return None
+        # Set the 'path' parameter to a new value
+        llm_trigger_node["parameters"]["path"] = f"{self.env_prefix}/{workspace}/{segment}"
+        del clone_data["settings"]['callerPolicy']
+        
+        # Create the new workflow
+        create_response = await client.post(
+            "/api/v1/workflows",
+            content=orjson.dumps(clone_data)
+        )
+        
+        if create_response.status_code == 200:
+            cloned_workflow = self._json(create_response)
+            self.logger.info(f"Successfully cloned workflow: {new_name}")
+            return cloned_workflow
+        else:
+            self.logger.error(f"Failed to create cloned workflow: {create_response.status_code}")
+            return None
             
-            if create_response.status_code == 200:
-                cloned_workflow = create_response.json()
-                self.logger.info(f"Successfully cloned workflow: {new_name}")
-                return cloned_workflow
-            else:
-                self.logger.error(f"Failed to create cloned workflow: {create_response.status_code}")
-                return None
-                
     
     async def _update_workflow_trigger(self, workflow_id: str, new_trigger_url: str) -> Optional[Dict[str, Any]]:
         """Update the webhook trigger URL in a workflow"""
-        async with httpx.AsyncClient() as client:
-            # Get current workflow
-            response = await client.get(
-                f"{self.n8n_base_url}/api/v1/workflows/{workflow_id}",
-                headers=self._get_headers(),
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                return None
-            
-            workflow = response.json().get('data', {})
-            nodes = workflow.get('nodes', [])
-            
-            # Find and update webhook trigger nodes
-            for node in nodes:
-                if node.get('type') == 'n8n-nodes-base.webhook':
-                    if 'parameters' not in node:
-                        node['parameters'] = {}
-                    node['parameters']['path'] = new_trigger_url
-                    self.logger.info(f"Updated webhook trigger path to: {new_trigger_url}")
-            
-            # Update the workflow
-            update_data = {
-                "nodes": nodes,
-                "connections": workflow.get('connections', {}),
-                "settings": workflow.get('settings', {})
-            }
-            
-            update_response = await client.put(
-                f"{self.n8n_base_url}/api/v1/workflows/{workflow_id}",
-                json=update_data,
-                headers=self._get_headers(),
-                timeout=30.0
-            )
-            
-            if update_response.status_code == 200:
-                self.logger.info(f"Successfully updated workflow trigger for workflow: {workflow_id}")
-                return update_response.json().get('data', {})
-            else:
-                self.logger.error(f"Failed to update workflow: {update_response.status_code}")
-                return None
+        client = await self._get_client()
+        # Get current workflow
+        response = await client.get(f"/api/v1/workflows/{workflow_id}")
+        
+        if response.status_code != 200:
+            return None
+        
+        workflow = self._json(response).get('data', {})
+        nodes = workflow.get('nodes', [])
+        
+        # Find and update webhook trigger nodes
+        for node in nodes:
+            if node.get('type') == 'n8n-nodes-base.webhook':
+                if 'parameters' not in node:
+                    node['parameters'] = {}
+                node['parameters']['path'] = new_trigger_url
+                self.logger.info(f"Updated webhook trigger path to: {new_trigger_url}")
+        
+        # Update the workflow
+        update_data = {
+            "nodes": nodes,
+            "connections": workflow.get('connections', {}),
+            "settings": workflow.get('settings', {})
+        }
+        
+        update_response = await client.put(
+            f"/api/v1/workflows/{workflow_id}",
+            content=orjson.dumps(update_data)
+        )
+        
+        if update_response.status_code == 200:
+            self.logger.info(f"Successfully updated workflow trigger for workflow: {workflow_id}")
+            return self._json(update_response).get('data', {})
+        else:
+            self.logger.error(f"Failed to update workflow: {update_response.status_code}")
+            return None
 
     
     async def _activate_workflow_api(self, workflow_id: str) -> bool:
         """Activate a workflow via n8n API"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.n8n_base_url}/api/v1/workflows/{workflow_id}/activate",
-                headers=self._get_headers(),
-                timeout=30.0
-            )
-            
-            if response.status_code == 200:
-                self.logger.info(f"Successfully activated workflow: {workflow_id}")
-                return True
-            else:
-                self.logger.error(f"Failed to activate workflow: {response.status_code}")
-                return False
-                    
+        client = await self._get_client()
+        response = await client.post(f"/api/v1/workflows/{workflow_id}/activate", timeout=N8N_CONTROL_TIMEOUT)
+        
+        if response.status_code == 200:
+            self.logger.info(f"Successfully activated workflow: {workflow_id}")
+            return True
+        else:
+            self.logger.error(f"Failed to activate workflow: {response.status_code}")
+            return False
+                
+    
+    async def _delete_workflow_api(self, workflow_id: str) -> bool:
+        """Delete a workflow via n8n API"""
+        client = await self._get_client()
+        response = await client.delete(f"/api/v1/workflows/{workflow_id}", timeout=N8N_CONTROL_TIMEOUT)
+        
+        if response.status_code == 200:
+            self.logger.info(f"Deleted workflow: {workflow_id}")
+            return True
+        else:
+            self.logger.error(f"Failed to delete workflow {workflow_id}: {response.status_code}")
+            return False
+                
     
     async def get_template_workflows(self) -> WorkflowTemplatesResponse:
         """Get all workflows with 'template' tag"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.n8n_base_url}/api/v1/workflows?tags=template",
-                headers=self._get_headers(),
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                error_msg = f"Failed to fetch workflows: {response.status_code}"
-                self.logger.error(error_msg)
-                return WorkflowTemplatesResponse(
-                    success=False,
-                    templates=[],
-                    message=error_msg,
-                )
-            
-            workflows = response.json().get('data', [])
-            templates = []
-            
-            for workflow in workflows:
-                tags = workflow.get('tags', [])
-                if isinstance(tags, list) and len(tags) == 2:
-                    tag_names = [tag.get('name', '') if isinstance(tag, dict) else str(tag) for tag in tags]
-                else:
-                    tag_names = []
-                
-                # Check if this workflow has 'template' tag
-                if 'template' in tag_names:                 
-                    templates.append([tag for tag in workflow.get('tags', '') 
-                              if tag != 'template'][0].get('name', ''))
-            
-            self.logger.info(f"Found {len(templates)} template workflows")
+        try:
+            template_index = await self._get_template_index()
+        except ValueError as e:
+            error_msg = str(e)
+            self.logger.error(error_msg)
             return WorkflowTemplatesResponse(
-                templates=templates,
-                message=f"Found {len(templates)} template workflows"
+                success=False,
+                templates=[],
+                message=error_msg,
             )
-                
+        
+        # Templates are tagged 'template' plus exactly one segment tag
+        templates = [
+            next(iter(tags - {'template'}))
+            for _, tags in template_index
+            if len(tags) == 2
+        ]
+        
+        self.logger.info(f"Found {len(templates)} template workflows")
+        return WorkflowTemplatesResponse(
+            templates=templates,
+            message=f"Found {len(templates)} template workflows"
+        )
+            
 
 
 
@@ -9,8 +9,10 @@ Usage:
 
 import asyncio
 import logging
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from typing import Dict, List
+from typing import List
 
 from telethon import TelegramClient, events
 
@@ -30,7 +32,8 @@ logger = logging.getLogger(__name__)
 class MediaGroupBuffer:
     """Buffer for collecting media group (album) messages."""
     messages: List = field(default_factory=list)
-    timer_task: asyncio.Task | None = None
+    timer_handle: asyncio.TimerHandle | None = None
+    last_touch: float = 0.0
 
 
 class TelegramUserClient:
@@ -43,22 +46,49 @@ class TelegramUserClient:
         )
         self.callback_service = CallbackService()
         
-        # Buffer for media groups (albums)
+        # Buffer for media groups (albums), least recently used first and
+        # capped at MAX_MEDIA_GROUPS
         # Key: media_group_id, Value: MediaGroupBuffer
-        self.media_group_buffers: Dict[str, MediaGroupBuffer] = {}
+        self.media_group_buffers: OrderedDict[int, MediaGroupBuffer] = OrderedDict()
+        self._reaper_task: asyncio.Task | None = None
+        # Media groups being processed, kept referenced until they finish
+        self._media_group_tasks: set[asyncio.Task] = set()
+        
+        # Single-message callbacks waiting to be batched (when enabled); None
+        # tells the batcher to send what it has and exit
+        self._callback_queue: asyncio.Queue[dict | None] = asyncio.Queue()
+        self._callback_batcher_task: asyncio.Task | None = None
+        # Batches being sent, kept referenced (and awaited on stop) until they finish
+        self._callback_sends: set[asyncio.Task] = set()
+        
+        # Limits concurrent media downloads across all messages
+        self._media_sem = asyncio.Semaphore(Config.MEDIA_CONCURRENCY)
+        
+        # Optional worker processes for media encoding
+        self._cpu_pool = (
+            ProcessPoolExecutor(max_workers=Config.MEDIA_CPU_WORKERS)
+            if Config.MEDIA_CPU_WORKERS > 0 else None
+        )
     
     async def start(self):
         """Start the Telegram client and begin listening for messages."""
         logger.info("Starting Telegram client...")
         
-        # Start callback service
-        await self.callback_service.start()
-        
         # Register event handler for incoming messages
         self.client.on(events.NewMessage(incoming=True))(self.on_new_message)
         
-        # Start the client (will prompt for phone/code on first run)
-        await self.client.start()
+        # Start the callback service (every callback reuses its pooled
+        # session) alongside the client, which will prompt for phone/code on
+        # first run; if either fails the other is cancelled
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(self.callback_service.start())
+            tg.create_task(self.client.start())
+        
+        # Drop media groups whose timer never processed them
+        self._reaper_task = asyncio.create_task(self._reap_stale_groups())
+        
+        if Config.CALLBACK_BATCH_WINDOW_MS > 0:
+            self._callback_batcher_task = asyncio.create_task(self._callback_batcher())
         
         me = await self.client.get_me()
         logger.info(f"Logged in as: {me.first_name} (@{me.username or 'no username'}) [ID: {me.id}]")
@@ -74,13 +104,42 @@ class TelegramUserClient:
     
     async def stop(self):
         """Stop the client and cleanup."""
-        # Cancel any pending media group timers
+        # Cancel any pending media group timers and drop their buffers
         for buffer in self.media_group_buffers.values():
-            if buffer.timer_task and not buffer.timer_task.done():
-                buffer.timer_task.cancel()
+            if buffer.timer_handle:
+                buffer.timer_handle.cancel()
+        self.media_group_buffers.clear()
+        
+        # Let the batcher send every callback queued so far before it exits
+        if self._callback_batcher_task:
+            self._callback_queue.put_nowait(None)
+            await asyncio.gather(self._callback_batcher_task, return_exceptions=True)
+        
+        # Cancel background tasks and wait until they have actually finished,
+        # so none is still running once the session and client are closed
+        tasks = [
+            task for task in (self._reaper_task, self._callback_batcher_task, *self._media_group_tasks)
+            if task
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._reaper_task = None
+        self._callback_batcher_task = None
+        
+        await asyncio.gather(*self._callback_sends, return_exceptions=True)
+        # Anything queued after the batcher exited is not sent
+        dropped = 0
+        while not self._callback_queue.empty():
+            if self._callback_queue.get_nowait() is not None:
+                dropped += 1
+        if dropped:
+            logger.warning(f"Dropped {dropped} queued callbacks on shutdown")
         
         await self.callback_service.stop()
         await self.client.disconnect()
+        if self._cpu_pool:
+            self._cpu_pool.shutdown(cancel_futures=True)
         logger.info("Client stopped.")
     
     async def on_new_message(self, event):
@@ -99,36 +158,59 @@ class TelegramUserClient:
     
     async def _handle_media_group_message(self, message):
         """Buffer media group messages and process after timeout."""
-        group_id = str(message.grouped_id)
+        group_id: int = message.grouped_id
         
-        # Create buffer if doesn't exist
-        if group_id not in self.media_group_buffers:
-            self.media_group_buffers[group_id] = MediaGroupBuffer()
+        # Create buffer if doesn't exist, evicting the least recently used
+        # groups beyond the cap
+        buffer = self.media_group_buffers.get(group_id)
+        if buffer is None:
+            buffer = self.media_group_buffers[group_id] = MediaGroupBuffer()
+            while len(self.media_group_buffers) > Config.MAX_MEDIA_GROUPS:
+                evicted_id, evicted = self.media_group_buffers.popitem(last=False)
+                self._drop_media_group(evicted_id, evicted, "buffer limit reached")
+        else:
+            self.media_group_buffers.move_to_end(group_id)
         
-        buffer = self.media_group_buffers[group_id]
+        loop = asyncio.get_running_loop()
         buffer.messages.append(message)
+        buffer.last_touch = loop.time()
         
         logger.debug(f"Buffered message for media group {group_id} (total: {len(buffer.messages)})")
         
-        # Cancel existing timer if any
-        if buffer.timer_task and not buffer.timer_task.done():
-            buffer.timer_task.cancel()
-        
-        # Start new timer to process the group
-        buffer.timer_task = asyncio.create_task(
-            self._process_media_group_after_timeout(group_id)
+        # Restart the debounce timer; only the last one fires
+        if buffer.timer_handle:
+            buffer.timer_handle.cancel()
+        buffer.timer_handle = loop.call_later(
+            Config.MEDIA_GROUP_TIMEOUT, self._schedule_media_group, group_id
         )
     
-    async def _process_media_group_after_timeout(self, group_id: str):
-        """Wait for timeout then process the media group."""
-        try:
-            await asyncio.sleep(Config.MEDIA_GROUP_TIMEOUT)
-            await self._process_media_group(group_id)
-        except asyncio.CancelledError:
-            # Timer was cancelled, new messages arrived
-            pass
+    def _drop_media_group(self, group_id: int, buffer: MediaGroupBuffer, reason: str):
+        """Discard a buffered media group without sending it."""
+        if buffer.timer_handle:
+            buffer.timer_handle.cancel()
+        logger.warning(f"Dropped media group {group_id} ({len(buffer.messages)} items): {reason}")
+    
+    async def _reap_stale_groups(self):
+        """Periodically drop media groups untouched for twice the group timeout."""
+        max_age = 2 * Config.MEDIA_GROUP_TIMEOUT
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(max_age)
+            now = loop.time()
+            stale = [
+                group_id for group_id, buffer in self.media_group_buffers.items()
+                if now - buffer.last_touch > max_age
+            ]
+            for group_id in stale:
+                self._drop_media_group(group_id, self.media_group_buffers.pop(group_id), "stale")
+    
+    def _schedule_media_group(self, group_id: int):
+        """Timer callback: process the media group once no new items arrived."""
+        task = asyncio.create_task(self._process_media_group(group_id))
+        self._media_group_tasks.add(task)
+        task.add_done_callback(self._media_group_tasks.discard)
     
-    async def _process_media_group(self, group_id: str):
+    async def _process_media_group(self, group_id: int):
         """Process all messages in a media group and send as single callback."""
         if group_id not in self.media_group_buffers:
             return
@@ -141,19 +223,22 @@ class TelegramUserClient:
         
         logger.info(f"Processing media group {group_id} with {len(messages)} items")
         
-        # Process all media files (includes violation info if not downloaded)
-        media_files = []
-        downloaded_count = 0
-        skipped_count = 0
-        
-        for msg in messages:
-            media_data = await MediaService.process_media(self.client, msg)
-            if media_data:
-                media_files.append(media_data)
-                if media_data.get("skipped"):
-                    skipped_count += 1
-                else:
-                    downloaded_count += 1
+        # Process all media files concurrently (includes violation info if not
+        # downloaded) and describe each message in the same pass; gather keeps
+        # the results in message order
+        async def process_item(msg):
+            media_data = await self._process_media(msg)
+            item = {
+                "message_id": msg.id,
+                "text": msg.text or msg.message,
+                "media": MessageService.get_media_info(msg)
+            }
+            return media_data, item
+        
+        results = await asyncio.gather(*(process_item(msg) for msg in messages))
+        media_files = [media_data for media_data, _ in results if media_data]
+        skipped_count = sum(1 for media_data in media_files if media_data.get("skipped"))
+        downloaded_count = len(media_files) - skipped_count
         
         # Use the first message as the base for the payload
         first_message = messages[0]
@@ -163,37 +248,36 @@ class TelegramUserClient:
             first_message,
             media_files=media_files if media_files else None,
             is_media_group=True,
-            media_group_id=group_id
+            media_group_id=str(group_id)
         )
         
         # Add info about all messages in the group
-        payload["media_group_messages"] = [
-            {
-                "message_id": msg.id,
-                "text": msg.text or msg.message,
-                "media": MessageService.get_media_info(msg)
-            }
-            for msg in messages
-        ]
+        payload["media_group_messages"] = [item for _, item in results]
         
-        # Log the message
-        sender_info = payload.get("sender", {})
-        chat_info = payload.get("chat", {})
-        skip_info = f" ({skipped_count} skipped)" if skipped_count > 0 else ""
-        logger.info(
-            f"Media group from {sender_info.get('name', 'Unknown')} "
-            f"in {chat_info.get('title', 'Private Chat')}: "
-            f"{downloaded_count} downloaded{skip_info}"
-        )
+        # Log the message (the summary is only built when INFO is enabled)
+        if logger.isEnabledFor(logging.INFO):
+            sender_info = payload.get("sender", {})
+            chat_info = payload.get("chat", {})
+            skip_info = f" ({skipped_count} skipped)" if skipped_count > 0 else ""
+            logger.info(
+                f"Media group from {sender_info.get('name', 'Unknown')} "
+                f"in {chat_info.get('title', 'Private Chat')}: "
+                f"{downloaded_count} downloaded{skip_info}"
+            )
         
         # Send to callback URL
         await self.callback_service.send(payload)
     
+    async def _process_media(self, message) -> dict | None:
+        """Download or describe a message's media, bounded by MEDIA_CONCURRENCY."""
+        async with self._media_sem:
+            return await MediaService.process_media(self.client, message, self._cpu_pool)
+    
     async def _process_single_message(self, message):
         """Process a single (non-grouped) message."""
         # Process media if present (includes violation info if not downloaded)
         media_files = []
-        media_data = await MediaService.process_media(self.client, message)
+        media_data = await self._process_media(message)
         if media_data:
             media_files.append(media_data)
         
@@ -203,30 +287,88 @@ class TelegramUserClient:
             media_files=media_files if media_files else None
         )
         
-        # Log the message
-        sender_info = payload.get("sender", {})
-        chat_info = payload.get("chat", {})
-        text_preview = (payload.get('text', '') or '')[:50]
-        
-        # Build media info for logging
-        if media_files:
-            media_item = media_files[0]
-            if media_item.get("skipped"):
-                violation = media_item.get("violation", {})
-                media_info = f" [{media_item['type']} SKIPPED: {violation.get('type', 'unknown')}]"
+        # Log the message (the preview is only built when INFO is enabled)
+        if logger.isEnabledFor(logging.INFO):
+            sender_info = payload.get("sender", {})
+            chat_info = payload.get("chat", {})
+            text_preview = (payload.get('text', '') or '')[:50]
+        
+            # Build media info for logging
+            if media_files:
+                media_item = media_files[0]
+                if media_item.get("skipped"):
+                    violation = media_item.get("violation", {})
+                    media_info = f" [{media_item['type']} SKIPPED: {violation.get('type', 'unknown')}]"
+                else:
+                    media_info = f" [{media_item['type']}]"
             else:
-                media_info = f" [{media_item['type']}]"
-        else:
-            media_info = ""
+                media_info = ""
         
-        logger.info(
-            f"New message from {sender_info.get('name', 'Unknown')} "
-            f"in {chat_info.get('title', 'Private Chat')}: "
-            f"{text_preview}...{media_info}"
-        )
+            logger.info(
+                f"New message from {sender_info.get('name', 'Unknown')} "
+                f"in {chat_info.get('title', 'Private Chat')}: "
+                f"{text_preview}...{media_info}"
+            )
         
-        # Send to callback URL using CallbackService
-        await self.callback_service.send(payload)
+        # Send to callback URL using CallbackService, batched when enabled
+        if self._callback_batcher_task:
+            self._callback_queue.put_nowait(payload)
+        else:
+            await self.callback_service.send(payload)
+    
+    async def _callback_batcher(self):
+        """Send queued single-message callbacks in batches.
+        
+        Waits up to CALLBACK_BATCH_WINDOW_MS after the first payload for up to
+        CALLBACK_BATCH_MAX payloads; a batch of one is sent as a plain payload.
+        Returns after sending everything queued before a None.
+        """
+        loop = asyncio.get_running_loop()
+        window = Config.CALLBACK_BATCH_WINDOW_MS / 1000
+        batch = []
+        try:
+            while True:
+                payload = await self._callback_queue.get()
+                if payload is None:
+                    return
+                batch = [payload]
+                stopping = False
+                deadline = loop.time() + window
+                while len(batch) < Config.CALLBACK_BATCH_MAX:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        payload = await asyncio.wait_for(self._callback_queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    if payload is None:
+                        stopping = True
+                        break
+                    batch.append(payload)
+                
+                # Shielded so cancelling the batcher does not abort a batch mid-send
+                send = asyncio.create_task(self._send_callback_batch(batch))
+                self._callback_sends.add(send)
+                send.add_done_callback(self._callback_sends.discard)
+                batch = []
+                await asyncio.shield(send)
+                if stopping:
+                    return
+        except asyncio.CancelledError:
+            if batch:
+                logger.warning(f"Dropped {len(batch)} batched callbacks: batcher cancelled")
+            raise
+    
+    async def _send_callback_batch(self, batch: list[dict]):
+        """Send one batch of callbacks, logging (not raising) failures."""
+        try:
+            if len(batch) == 1:
+                await self.callback_service.send(batch[0])
+            else:
+                await self.callback_service.send_batch(batch)
+        except Exception as e:
+            logger.error(f"Error sending callback batch: {e}", exc_info=True)
 
 
 async def main():